@@ -4,17 +4,24 @@
 AIアシスタントとのチャット機能を提供するAPIエンドポイント
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from semantic_kernel import Kernel
 from semantic_kernel.contents import ChatHistory
 from semantic_kernel.connectors.ai.open_ai.prompt_execution_settings.open_ai_prompt_execution_settings import (
     OpenAIChatPromptExecutionSettings,
 )
 from semantic_kernel.connectors.ai.function_choice_behavior import FunctionChoiceBehavior
-import json
-import traceback
+from typing import AsyncIterator
+import logging
+import numpy as np
 
-from app.models.schemas import ChatRequest, ChatResponse
-from app.core.ai import get_kernel
+from app.models.schemas import ChatRequest, ChatResponse, ChatMessage
+from app.core.ai import get_kernel, get_task_plugin, TASK_PLUGIN_NAME
+from app.core.cache import SemanticCache
+from app.core.responses import ORJSONResponse
+from app.core.serialization import json_dumps
 from app.core.config import settings
 from app.plugins.task_management import TaskManagementPlugin
 from app.prompts.system_prompts import TASK_ASSISTANT_PROMPT, get_task_context_prompt
@@ -22,14 +29,234 @@ from app.prompts.system_prompts import TASK_ASSISTANT_PROMPT, get_task_context_p
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
+# 状態を変更しない応答を再利用するセマンティックキャッシュ(無効の場合はNone)
+semantic_cache = SemanticCache(
+    threshold=settings.semantic_cache_threshold,
+    max_entries=settings.semantic_cache_max_entries,
+) if settings.semantic_cache_enabled else None
+
+# 実行設定(関数呼び出しを自動で有効化)
+# Semantic Kernelは呼び出しごとに設定をコピーしてから使うため、全リクエストで共有できる
+_EXEC_SETTINGS = OpenAIChatPromptExecutionSettings(
+    service_id="chat",
+    max_tokens=settings.ai_max_tokens,
+    temperature=settings.ai_temperature,
+)
+_EXEC_SETTINGS.function_choice_behavior = FunctionChoiceBehavior.Auto(
+    filters={"included_plugins": [TASK_PLUGIN_NAME]}
+)
+
+
+async def _embed_prompt(kernel: Kernel, message: str) -> np.ndarray | None:
+    """
+    プロンプトの埋め込みベクトルを生成
+    
+    Args:
+        kernel: Semantic Kernelインスタンス
+        message: ユーザーからのメッセージ
+    
+    Returns:
+        埋め込みベクトル(生成に失敗した場合はNone)
+    """
+    try:
+        embedding_service = kernel.get_service("embedding")
+        embeddings = await embedding_service.generate_embeddings([message])
+        return embeddings[0]
+    except Exception:
+        # キャッシュは最適化のため、失敗してもチャット自体は継続する
+        logger.warning("⚠️ 埋め込みの生成に失敗したため、キャッシュを使用しません", exc_info=True)
+        return None
+
+
+def _build_task_context(req: ChatRequest) -> str:
+    """
+    現在のタスク状況を表すプロンプトを生成
+    
+    Args:
+        req: チャットリクエスト
+    
+    Returns:
+        タスク状況のプロンプト(タスクがない場合は空文字列)
+    """
+    if not req.tasks:
+        return ""
+    
+    # 1回の走査で未完了・完了に振り分ける
+    todo_tasks: list[dict] = []
+    done_tasks: list[dict] = []
+    for t in req.tasks:
+        status = t.get("status")
+        if status == "todo":
+            todo_tasks.append(t)
+        elif status == "done":
+            done_tasks.append(t)
+    
+    # タスクリストを生成（最大10件まで）
+    task_list = ""
+    if todo_tasks:
+        task_list = "【未完了タスク】\n" + "\n".join([
+            f"- ID: {t.get('id')}, タイトル: {t.get('title')}, 優先度: {t.get('priority')}" 
+            for t in todo_tasks[:10]
+        ])
+    
+    # 完了タスクも追加（削除操作のため）
+    if done_tasks:
+        done_task_list = "\n【完了タスク】\n" + "\n".join([
+            f"- ID: {t.get('id')}, タイトル: {t.get('title')}, 優先度: {t.get('priority')}" 
+            for t in done_tasks[:10]
+        ])
+        task_list += done_task_list
+    
+    return get_task_context_prompt(
+        todo_count=len(todo_tasks),
+        done_count=len(done_tasks),
+        task_list=task_list
+    )
+
+
+def _build_chat_history(system_prompt: str, history: list[ChatMessage], message: str) -> ChatHistory:
+    """
+    AIに送信するChatHistoryを作成
+    
+    Args:
+        system_prompt: システムプロンプト
+        history: 過去の会話履歴
+        message: 現在のユーザーメッセージ
+    
+    Returns:
+        ChatHistory: 会話履歴
+    """
+    chat_history = ChatHistory()
+    chat_history.add_system_message(system_prompt)
+    
+    for msg in history:
+        if msg.role == "user":
+            chat_history.add_user_message(msg.content)
+        elif msg.role == "assistant":
+            chat_history.add_assistant_message(msg.content)
+    
+    # 現在のユーザーメッセージを追加
+    chat_history.add_user_message(message)
+    return chat_history
+
+
+async def _lookup_cache(
+    kernel: Kernel, message: str, system_prompt: str, history: list[ChatMessage]
+) -> tuple[str | None, str | None, np.ndarray | None]:
+    """
+    同じ文脈(タスク状況・会話履歴)で類似した質問の応答をキャッシュから検索
+    
+    Args:
+        kernel: Semantic Kernelインスタンス
+        message: 現在のユーザーメッセージ
+        system_prompt: システムプロンプト
+        history: 過去の会話履歴
+    
+    Returns:
+        (キャッシュされた応答, キャッシュキー, 埋め込みベクトル)
+        キャッシュが無効の場合はキーもNone、同じ文脈のエントリがない・埋め込みに失敗した場合はベクトルがNone
+    """
+    if semantic_cache is None:
+        return None, None, None
+    
+    cache_key = SemanticCache.context_key(
+        system_prompt, *(f"{m.role}:{m.content}" for m in history)
+    )
+    # 会話が進むと文脈のキーは毎回変わるため、同じ文脈のエントリがなければ埋め込みの生成(API呼び出し)を省略する
+    if not semantic_cache.has_context(cache_key):
+        return None, cache_key, None
+    
+    prompt_embedding = await _embed_prompt(kernel, message)
+    if prompt_embedding is None:
+        return None, cache_key, None
+    
+    cached_text = semantic_cache.lookup(cache_key, prompt_embedding)
+    if cached_text is not None:
+        logger.info("⚡ セマンティックキャッシュにヒットしました")
+    return cached_text, cache_key, prompt_embedding
+
+
+async def _store_cache(
+    kernel: Kernel,
+    cache_key: str,
+    message: str,
+    prompt_embedding: np.ndarray | None,
+    response_chunks: list[str],
+) -> None:
+    """
+    応答をキャッシュに保存(レスポンスの送信後にバックグラウンドで実行)
+    
+    検索時に埋め込みを生成していない場合は、ここで生成します。
+    
+    Args:
+        kernel: Semantic Kernelインスタンス
+        cache_key: 文脈のキー
+        message: ユーザーからのメッセージ
+        prompt_embedding: 検索時に生成した埋め込みベクトル(未生成の場合はNone)
+        response_chunks: キャッシュする応答(空の場合は保存しない)
+    """
+    if not response_chunks:
+        return
+    if prompt_embedding is None:
+        prompt_embedding = await _embed_prompt(kernel, message)
+        if prompt_embedding is None:
+            return
+    semantic_cache.store(cache_key, prompt_embedding, "".join(response_chunks))
+
+
+def _collect_actions(task_plugin: TaskManagementPlugin) -> dict | None:
+    """
+    プラグインに蓄積されたアクションを取り出す
+    
+    Args:
+        task_plugin: タスク管理プラグイン
+    
+    Returns:
+        フロントエンドに返すアクションのJSON(アクションがない場合はNone)
+    """
+    actions = task_plugin.drain()
+    logger.info(
+        "📝 アクション: create=%d, delete=%d, complete=%d, uncomplete=%d, update_priority=%d",
+        len(actions["create"]), len(actions["delete"]), len(actions["complete"]),
+        len(actions["uncomplete"]), len(actions["update_priority"]),
+    )
+    
+    has_actions = any([
+        actions["create"],
+        actions["delete"],
+        actions["complete"],
+        actions["uncomplete"],
+        actions["update_priority"]
+    ])
+    if not has_actions:
+        return None
+    
+    return {
+        "__task_actions__": {
+            "create": actions["create"],
+            "delete": actions["delete"],
+            "complete": actions["complete"],
+            "uncomplete": actions["uncomplete"],
+            "update_priority": actions["update_priority"]
+        }
+    }
+
 
 @router.post("/api/chat", response_model=ChatResponse)
-async def chat(req: ChatRequest):
+async def chat(
+    req: ChatRequest,
+    kernel: Kernel = Depends(get_kernel),
+    task_plugin: TaskManagementPlugin = Depends(get_task_plugin),
+):
     """
     AIアシスタントとチャットする
     
     Args:
         req: チャットリクエスト（メッセージ、タスク、履歴を含む）
+        kernel: 起動時に初期化したKernel
+        task_plugin: タスク管理プラグイン
     
     Returns:
         ChatResponse: AIアシスタントからの応答
@@ -37,133 +264,165 @@ async def chat(req: ChatRequest):
     Raises:
         HTTPException: AI処理エラーが発生した場合
     """
-    print("=" * 50)
-    print("🔵 チャットリクエストを受信しました")
-    print(f"メッセージ: {req.message}")
-    print(f"タスク数: {len(req.tasks)}")
-    print("=" * 50)
+    logger.info("🔵 チャットリクエストを受信しました (タスク数: %d)", len(req.tasks))
+    logger.debug("メッセージ: %s", req.message)
     
+    actions_token = None
     try:
-        # Kernelを取得
-        kernel = get_kernel()
-        
-        # タスク管理プラグインの初期化
-        task_plugin = TaskManagementPlugin()
-        
-        # 既存のプラグインを削除してから追加（重複を防ぐ）
-        plugin_name = "TaskManagement"
-        if plugin_name in kernel.plugins:
-            kernel.plugins.pop(plugin_name)
-        
-        kernel.add_plugin(task_plugin, plugin_name=plugin_name)
-        
-        # 現在のタスク状況を文脈に追加
-        task_context = ""
-        if req.tasks:
-            todo_tasks = [t for t in req.tasks if t.status == "todo"]
-            done_tasks = [t for t in req.tasks if t.status == "done"]
-            
-            # タスクリストを生成（最大10件まで）
-            task_list = ""
-            if todo_tasks:
-                task_list = "【未完了タスク】\n" + "\n".join([
-                    f"- ID: {t.id}, タイトル: {t.title}, 優先度: {t.priority}" 
-                    for t in todo_tasks[:10]
-                ])
-            
-            # 完了タスクも追加（削除操作のため）
-            if done_tasks:
-                done_task_list = "\n【完了タスク】\n" + "\n".join([
-                    f"- ID: {t.id}, タイトル: {t.title}, 優先度: {t.priority}" 
-                    for t in done_tasks[:10]
-                ])
-                task_list += done_task_list
-            
-            task_context = get_task_context_prompt(
-                todo_count=len(todo_tasks),
-                done_count=len(done_tasks),
-                task_list=task_list
-            )
-
-        # ChatHistoryを作成
-        chat_history = ChatHistory()
-        chat_history.add_system_message(TASK_ASSISTANT_PROMPT + task_context)
-        
-        # 過去の会話履歴を追加（設定で指定された件数まで）
-        for msg in req.history[-settings.chat_history_limit:]:
-            if msg.role == "user":
-                chat_history.add_user_message(msg.content)
-            elif msg.role == "assistant":
-                chat_history.add_assistant_message(msg.content)
+        actions_token = task_plugin.begin_actions()
         
-        # 現在のユーザーメッセージを追加
-        chat_history.add_user_message(req.message)
-
-        print(f"🟢 AIにリクエスト送信中... (履歴: {len(req.history[-settings.chat_history_limit:])}件)")
-        print(f"📜 会話履歴: {[f'{m.role}: {m.content[:30]}...' for m in req.history[-3:]]}")
+        # 現在のタスク状況を文脈に追加してChatHistoryを作成（履歴は設定で指定された件数まで）
+        system_prompt = f"{TASK_ASSISTANT_PROMPT}{_build_task_context(req)}"
+        history = req.history[-settings.chat_history_limit:]
+        chat_history = _build_chat_history(system_prompt, history, req.message)
         
-        # 実行設定（関数呼び出しを自動で有効化）
-        execution_settings = OpenAIChatPromptExecutionSettings(
-            service_id="chat",
-            max_tokens=settings.ai_max_tokens,
-            temperature=settings.ai_temperature,
-        )
-        # 自動関数呼び出しを有効化
-        execution_settings.function_choice_behavior = FunctionChoiceBehavior.Auto(
-            filters={"included_plugins": ["TaskManagement"]}
+        cached_text, cache_key, prompt_embedding = await _lookup_cache(
+            kernel, req.message, system_prompt, history
         )
+        if cached_text is not None:
+            return ORJSONResponse({"response": cached_text})
+
+        logger.info("🟢 AIにリクエスト送信中... (履歴: %d件)", len(history))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📜 会話履歴: %s", [f"{m.role}: {m.content[:30]}..." for m in req.history[-3:]])
         
         # チャット完了を実行
         chat_service = kernel.get_service("chat")
         response = await chat_service.get_chat_message_contents(
             chat_history=chat_history,
-            settings=execution_settings,
+            settings=_EXEC_SETTINGS,
             kernel=kernel,
         )
         
         # レスポンステキストを取得
         response_text = str(response[0].content) if response else "応答がありませんでした。"
         
-        print(f"🟢 AIからレスポンス受信: {response_text[:100]}...")
-        
-        # プラグインからアクションを取得
-        actions = task_plugin.get_actions()
-        print(f"📝 アクション: create={len(actions['create'])}, delete={len(actions['delete'])}, "
-              f"complete={len(actions['complete'])}, uncomplete={len(actions['uncomplete'])}, "
-              f"update_priority={len(actions['update_priority'])}")
+        logger.debug("🟢 AIからレスポンス受信: %s...", response_text[:100])
         
         # アクションがある場合は構造化されたJSONとして追加
-        has_actions = any([
-            actions["create"],
-            actions["delete"],
-            actions["complete"],
-            actions["uncomplete"],
-            actions["update_priority"]
-        ])
-        
-        if has_actions:
-            actions_json = {
-                "__task_actions__": {
-                    "create": actions["create"],
-                    "delete": actions["delete"],
-                    "complete": actions["complete"],
-                    "uncomplete": actions["uncomplete"],
-                    "update_priority": actions["update_priority"]
-                }
-            }
-            response_text += f"\n\n{json.dumps(actions_json)}"
-        
-        # プラグインをクリーンアップ
-        task_plugin.clear_actions()
-        print("=" * 50)
+        actions_json = _collect_actions(task_plugin)
+        if actions_json:
+            response_text += f"\n\n{json_dumps(actions_json)}"
+        elif response and cache_key is not None:
+            # タスクを変更しない応答のみ、送信後にキャッシュする
+            return ORJSONResponse(
+                {"response": response_text},
+                background=BackgroundTask(
+                    _store_cache, kernel, cache_key, req.message, prompt_embedding, [response_text]
+                ),
+            )
 
-        return ChatResponse(response=response_text)
+        # レスポンスモデルの再検証を省略して直接返す
+        return ORJSONResponse({"response": response_text})
 
     except Exception as e:
-        # 詳細なエラー情報をログに出力
-        print("🔴 エラーが発生しました!")
-        print(f"エラー詳細: {str(e)}")
-        print(f"エラータイプ: {type(e).__name__}")
-        print(f"トレースバック:\n{traceback.format_exc()}")
-        print("=" * 50)
+        # 詳細なエラー情報(トレースバック付き)をログに出力
+        logger.exception("🔴 エラーが発生しました! (%s: %s)", type(e).__name__, e)
         raise HTTPException(status_code=500, detail=f"AI処理エラー: {str(e)}")
+    
+    finally:
+        # このリクエストのアクションバッファを破棄
+        if actions_token is not None:
+            task_plugin.end_actions(actions_token)
+
+
+def _sse_event(payload: dict) -> str:
+    """
+    Server-Sent Eventsのイベント文字列を生成
+    
+    Args:
+        payload: イベントとして送信するデータ
+    
+    Returns:
+        SSE形式の文字列
+    """
+    return f"data: {json_dumps(payload)}\n\n"
+
+
+@router.post("/api/chat/stream")
+async def chat_stream(
+    req: ChatRequest,
+    kernel: Kernel = Depends(get_kernel),
+    task_plugin: TaskManagementPlugin = Depends(get_task_plugin),
+):
+    """
+    AIアシスタントとチャットする(ストリーミング)
+    
+    応答をServer-Sent Eventsで逐次返します。
+    生成されたテキストは {"delta": "..."} イベントとして送信し、
+    タスク操作がある場合は最後に {"__task_actions__": {...}} イベントを送信します。
+    ストリーム開始後のエラーは {"error": "..."} イベントとして通知します。
+    
+    Args:
+        req: チャットリクエスト（メッセージ、タスク、履歴を含む）
+        kernel: 起動時に初期化したKernel
+        task_plugin: タスク管理プラグイン
+    
+    Returns:
+        StreamingResponse: text/event-stream 形式のレスポンス
+        
+    Raises:
+        HTTPException: ストリーム開始前にAI処理エラーが発生した場合
+    """
+    logger.info("🔵 ストリーミングチャットリクエストを受信しました (タスク数: %d)", len(req.tasks))
+    logger.debug("メッセージ: %s", req.message)
+    
+    try:
+        system_prompt = f"{TASK_ASSISTANT_PROMPT}{_build_task_context(req)}"
+        history = req.history[-settings.chat_history_limit:]
+        chat_history = _build_chat_history(system_prompt, history, req.message)
+        
+        cached_text, cache_key, prompt_embedding = await _lookup_cache(
+            kernel, req.message, system_prompt, history
+        )
+    except Exception as e:
+        logger.exception("🔴 エラーが発生しました! (%s: %s)", type(e).__name__, e)
+        raise HTTPException(status_code=500, detail=f"AI処理エラー: {str(e)}")
+    
+    # タスクを変更しない応答のみ、ストリームの送信後にキャッシュする
+    cacheable_chunks: list[str] = []
+    
+    async def event_stream() -> AsyncIterator[str]:
+        if cached_text is not None:
+            yield _sse_event({"delta": cached_text})
+            return
+        
+        # ストリームは別タスクで送信されるため、バッファはここで用意する
+        actions_token = task_plugin.begin_actions()
+        try:
+            logger.info("🟢 AIにストリーミングリクエスト送信中... (履歴: %d件)", len(history))
+            chat_service = kernel.get_service("chat")
+            chunks: list[str] = []
+            async for messages in chat_service.get_streaming_chat_message_contents(
+                chat_history=chat_history,
+                settings=_EXEC_SETTINGS,
+                kernel=kernel,
+            ):
+                # 関数呼び出しのチャンクなど、テキストを含まないものは送信しない
+                delta = messages[0].content if messages else None
+                if delta:
+                    chunks.append(delta)
+                    yield _sse_event({"delta": delta})
+            
+            # ストリーム終了後にアクションを送信
+            actions_json = _collect_actions(task_plugin)
+            if actions_json:
+                yield _sse_event(actions_json)
+            else:
+                cacheable_chunks.extend(chunks)
+        
+        except Exception as e:
+            logger.exception("🔴 エラーが発生しました! (%s: %s)", type(e).__name__, e)
+            yield _sse_event({"error": f"AI処理エラー: {str(e)}"})
+        
+        finally:
+            task_plugin.end_actions(actions_token)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+        background=BackgroundTask(
+            _store_cache, kernel, cache_key, req.message, prompt_embedding, cacheable_chunks
+        ) if cache_key is not None else None,
+    )
@@ -5,12 +5,16 @@
 """
 
 from fastapi import APIRouter
-from app.core.database import engine
+from sqlalchemy import text
+from app.core.database import async_engine
 from app.core.config import settings
 
 
 router = APIRouter()
 
+# 設定値は起動後に変わらないため、モジュール読み込み時に評価しておく
+OPENAI_CONFIGURED = bool(settings.openai_api_key)
+
 
 @router.get("/health")
 async def health():
@@ -27,15 +31,15 @@ async def health():
     """
     # DB接続確認
     try:
-        with engine.connect() as conn:
-            conn.execute("SELECT 1")
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
         db_status = "ok"
     except Exception as e:
         db_status = f"error: {str(e)}"
 
     return {
         "status": "ok",
-        "openai_configured": bool(settings.openai_api_key),
+        "openai_configured": OPENAI_CONFIGURED,
         "db_status": db_status,
         "app_name": settings.app_name,
         "version": settings.app_version,
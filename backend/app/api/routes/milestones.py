@@ -4,20 +4,40 @@
 マイルストーンのCRUD操作を提供するAPIエンドポイント
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy.orm import selectinload
+from pydantic import TypeAdapter
 from typing import List
-from app.core.database import get_db, MilestoneModel
+from app.core.database import get_conn, get_db, MilestoneModel, utcnow
+from app.core.ids import new_id
+from app.core.etag import cache_headers, list_etag, not_modified
+from app.core.responses import list_response, model_response
 from app.models.schemas import Milestone, MilestoneCreate, MilestoneUpdate
-from datetime import datetime
-import uuid
 
 
 router = APIRouter()
 
+# 一覧レスポンスのシリアライザー(スキーマの構築は起動時に1回だけ行う)
+MILESTONE_LIST_ADAPTER = TypeAdapter(List[Milestone])
+
+# 更新リクエストのフィールド名とカラム名の対応
+UPDATE_FIELD_MAP = {
+    "title": "title",
+    "description": "description",
+    "order": "order_num",
+    "dueDate": "due_date",
+    "status": "status",
+}
+
 
 @router.get("/api/milestones", response_model=List[Milestone])
-def get_milestones(project_id: str = None, db: Session = Depends(get_db)):
+async def get_milestones(
+    request: Request,
+    project_id: str = None,
+    conn: AsyncConnection = Depends(get_conn)
+):
     """
     マイルストーンを取得
     
@@ -25,19 +45,27 @@ def get_milestones(project_id: str = None, db: Session = Depends(get_db)):
         project_id: プロジェクトID(オプション、指定すると該当プロジェクトのみ)
         
     Returns:
-        List[Milestone]: マイルストーンのリスト
+        List[Milestone]: マイルストーンのリスト(変更がない場合は304)
     """
-    query = db.query(MilestoneModel)
+    criteria = [MilestoneModel.project_id == project_id] if project_id else []
     
-    if project_id:
-        query = query.filter(MilestoneModel.project_id == project_id)
+    # 前回から変更がなければ本体を返さない
+    etag = await list_etag(conn, MilestoneModel, *criteria)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
     
-    milestones = query.order_by(MilestoneModel.order_num).all()
-    return [model_to_schema(m) for m in milestones]
+    # 読み取りのみのため、ORMを介さずテーブルの行を直接取得する
+    stmt = select(MilestoneModel.__table__).where(*criteria)
+    
+    result = await conn.execute(stmt.order_by(MilestoneModel.order_num))
+    milestones = result.all()
+    # 検証済みのデータを直接返し、FastAPIによるレスポンスの再検証を省略する
+    return list_response(MILESTONE_LIST_ADAPTER, milestones, headers=cache_headers(etag))
 
 
 @router.get("/api/milestones/{milestone_id}", response_model=Milestone)
-def get_milestone(milestone_id: str, db: Session = Depends(get_db)):
+async def get_milestone(milestone_id: str, db: AsyncSession = Depends(get_db)):
     """
     特定のマイルストーンを取得
     
@@ -50,14 +78,14 @@ def get_milestone(milestone_id: str, db: Session = Depends(get_db)):
     Raises:
         HTTPException: マイルストーンが見つからない場合
     """
-    milestone = db.query(MilestoneModel).filter(MilestoneModel.id == milestone_id).first()
+    milestone = await db.get(MilestoneModel, milestone_id)
     if not milestone:
         raise HTTPException(status_code=404, detail="Milestone not found")
-    return model_to_schema(milestone)
+    return model_response(Milestone.model_validate(milestone))
 
 
 @router.post("/api/milestones", response_model=Milestone)
-def create_milestone(milestone: MilestoneCreate, db: Session = Depends(get_db)):
+async def create_milestone(milestone: MilestoneCreate, db: AsyncSession = Depends(get_db)):
     """
     新規マイルストーンを作成
     
@@ -67,29 +95,26 @@ def create_milestone(milestone: MilestoneCreate, db: Session = Depends(get_db)):
     Returns:
         Milestone: 作成されたマイルストーン
     """
-    now = datetime.now().isoformat()
-    
-    new_milestone = MilestoneModel(
-        id=str(uuid.uuid4()),
-        project_id=milestone.projectId,
+    stmt = insert(MilestoneModel).values(
+        id=new_id(),
+        project_id=milestone.project_id,
         title=milestone.title,
         description=milestone.description,
         order_num=milestone.order,
-        due_date=milestone.dueDate,
-        status=milestone.status,
-        created_at=now,
-        updated_at=now
-    )
+        due_date=milestone.due_date,
+        status=milestone.status
+    ).returning(MilestoneModel)
     
-    db.add(new_milestone)
-    db.commit()
-    db.refresh(new_milestone)
+    # INSERT ... RETURNING で作成した行を1往復で取得
+    result = await db.execute(stmt)
+    new_milestone = result.scalar_one()
+    await db.commit()
     
-    return model_to_schema(new_milestone)
+    return model_response(Milestone.model_validate(new_milestone))
 
 
 @router.put("/api/milestones/{milestone_id}", response_model=Milestone)
-def update_milestone(milestone_id: str, updates: MilestoneUpdate, db: Session = Depends(get_db)):
+async def update_milestone(milestone_id: str, updates: MilestoneUpdate, db: AsyncSession = Depends(get_db)):
     """
     マイルストーンを更新
     
@@ -103,35 +128,30 @@ def update_milestone(milestone_id: str, updates: MilestoneUpdate, db: Session =
     Raises:
         HTTPException: マイルストーンが見つからない場合
     """
-    milestone = db.query(MilestoneModel).filter(MilestoneModel.id == milestone_id).first()
+    milestone = await db.get(MilestoneModel, milestone_id)
     if not milestone:
         raise HTTPException(status_code=404, detail="Milestone not found")
     
     # 更新処理(Noneでないフィールドのみ)
-    if updates.title is not None:
-        milestone.title = updates.title
-    if updates.description is not None:
-        milestone.description = updates.description
-    if updates.order is not None:
-        milestone.order_num = updates.order
-    if updates.dueDate is not None:
-        milestone.due_date = updates.dueDate
-    if updates.status is not None:
-        milestone.status = updates.status
-        # 完了状態になった場合、完了日時を記録
-        if updates.status == 'done' and not milestone.completed_at:
-            milestone.completed_at = datetime.now().isoformat()
+    for field, value in updates.model_dump(exclude_unset=True, by_alias=True).items():
+        if value is None:
+            continue
+        setattr(milestone, UPDATE_FIELD_MAP[field], value)
     
-    milestone.updated_at = datetime.now().isoformat()
+    # 完了状態になった場合、完了日時を記録
+    if updates.status == 'done' and not milestone.completed_at:
+        milestone.completed_at = utcnow()
     
-    db.commit()
-    db.refresh(milestone)
+    milestone.updated_at = utcnow()
     
-    return model_to_schema(milestone)
+    await db.commit()
+    await db.refresh(milestone)
+    
+    return model_response(Milestone.model_validate(milestone))
 
 
 @router.delete("/api/milestones/{milestone_id}")
-def delete_milestone(milestone_id: str, db: Session = Depends(get_db)):
+async def delete_milestone(milestone_id: str, db: AsyncSession = Depends(get_db)):
     """
     マイルストーンを削除
     
@@ -146,35 +166,12 @@ def delete_milestone(milestone_id: str, db: Session = Depends(get_db)):
     Raises:
         HTTPException: マイルストーンが見つからない場合
     """
-    milestone = db.query(MilestoneModel).filter(MilestoneModel.id == milestone_id).first()
+    # SQLiteでは外部キー制約が無効のため、タスクを読み込んでORMがmilestone_idをNULLにする
+    milestone = await db.get(MilestoneModel, milestone_id, options=[selectinload(MilestoneModel.tasks)])
     if not milestone:
         raise HTTPException(status_code=404, detail="Milestone not found")
     
-    db.delete(milestone)
-    db.commit()
+    await db.delete(milestone)
+    await db.commit()
     
     return {"message": "Milestone deleted successfully"}
-
-
-def model_to_schema(model: MilestoneModel) -> Milestone:
-    """
-    ORMモデルをPydanticスキーマに変換
-    
-    Args:
-        model: MilestoneModelインスタンス
-        
-    Returns:
-        Milestone: Pydanticスキーマ
-    """
-    return Milestone(
-        id=model.id,
-        projectId=model.project_id,
-        title=model.title,
-        description=model.description,
-        order=model.order_num,
-        dueDate=model.due_date,
-        status=model.status,
-        completedAt=model.completed_at,
-        createdAt=model.created_at,
-        updatedAt=model.updated_at
-    )
@@ -4,21 +4,43 @@
 プロジェクトのCRUD操作を提供するAPIエンドポイント
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy.orm import selectinload
+from pydantic import TypeAdapter
 from typing import List
-from app.core.database import get_db, ProjectModel
+from app.core.database import get_conn, get_db, ProjectModel, utcnow
+from app.core.ids import new_id
+from app.core.etag import cache_headers, list_etag, not_modified
+from app.core.responses import list_response, model_response
 from app.models.schemas import Project, ProjectCreate, ProjectUpdate
-from datetime import datetime
-import uuid
-import json
 
 
 router = APIRouter()
 
+# 一覧レスポンスのシリアライザー(スキーマの構築は起動時に1回だけ行う)
+PROJECT_LIST_ADAPTER = TypeAdapter(List[Project])
+
+# 更新リクエストのフィールド名とカラム名の対応
+UPDATE_FIELD_MAP = {
+    "title": "title",
+    "description": "description",
+    "goal": "goal",
+    "status": "status",
+    "targetEndDate": "target_end_date",
+    "tags": "tags",
+    "color": "color",
+    "context": "context",
+}
+
 
 @router.get("/api/projects", response_model=List[Project])
-def get_projects(user_id: str = "default_user", db: Session = Depends(get_db)):
+async def get_projects(
+    request: Request,
+    user_id: str = "default_user",
+    conn: AsyncConnection = Depends(get_conn)
+):
     """
     全プロジェクトを取得
     
@@ -26,14 +48,27 @@ def get_projects(user_id: str = "default_user", db: Session = Depends(get_db)):
         user_id: ユーザーID(デフォルト: "default_user")
     
     Returns:
-        List[Project]: プロジェクトのリスト
+        List[Project]: プロジェクトのリスト(変更がない場合は304)
     """
-    projects = db.query(ProjectModel).filter(ProjectModel.user_id == user_id).all()
-    return [model_to_schema(p) for p in projects]
+    criteria = [ProjectModel.user_id == user_id]
+    
+    # 前回から変更がなければ本体を返さない
+    etag = await list_etag(conn, ProjectModel, *criteria)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    # 読み取りのみのため、ORMを介さずテーブルの行を直接取得する
+    stmt = select(ProjectModel.__table__).where(*criteria)
+    
+    result = await conn.execute(stmt)
+    projects = result.all()
+    # 検証済みのデータを直接返し、FastAPIによるレスポンスの再検証を省略する
+    return list_response(PROJECT_LIST_ADAPTER, projects, headers=cache_headers(etag))
 
 
 @router.get("/api/projects/{project_id}", response_model=Project)
-def get_project(project_id: str, db: Session = Depends(get_db)):
+async def get_project(project_id: str, db: AsyncSession = Depends(get_db)):
     """
     特定のプロジェクトを取得
     
@@ -46,14 +81,14 @@ def get_project(project_id: str, db: Session = Depends(get_db)):
     Raises:
         HTTPException: プロジェクトが見つからない場合
     """
-    project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
+    project = await db.get(ProjectModel, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    return model_to_schema(project)
+    return model_response(Project.model_validate(project))
 
 
 @router.post("/api/projects", response_model=Project)
-def create_project(project: ProjectCreate, db: Session = Depends(get_db)):
+async def create_project(project: ProjectCreate, db: AsyncSession = Depends(get_db)):
     """
     新規プロジェクトを作成
     
@@ -63,43 +98,30 @@ def create_project(project: ProjectCreate, db: Session = Depends(get_db)):
     Returns:
         Project: 作成されたプロジェクト
     """
-    now = datetime.now().isoformat()
-    
-    # コンテキストをJSON文字列に変換
-    context_json = None
-    if project.context:
-        context_json = json.dumps({
-            "motivation": project.context.motivation,
-            "weeklyHours": project.context.weeklyHours,
-            "constraints": project.context.constraints,
-            "resources": project.context.resources
-        })
-    
-    new_project = ProjectModel(
-        id=str(uuid.uuid4()),
-        user_id=project.userId,  # リクエストから取得(デフォルトは"default_user")
+    stmt = insert(ProjectModel).values(
+        id=new_id(),
+        user_id=project.user_id,  # リクエストから取得(デフォルトは"default_user")
         title=project.title,
         description=project.description,
         goal=project.goal,
         status=project.status,
-        start_date=project.startDate,
-        target_end_date=project.targetEndDate,
-        tags=json.dumps(project.tags),
+        start_date=project.start_date,
+        target_end_date=project.target_end_date,
+        tags=project.tags,
         color=project.color,
-        context=context_json,
-        created_at=now,
-        updated_at=now
-    )
+        context=project.context.model_dump(by_alias=True) if project.context else None
+    ).returning(ProjectModel)
     
-    db.add(new_project)
-    db.commit()
-    db.refresh(new_project)
+    # INSERT ... RETURNING で作成した行を1往復で取得
+    result = await db.execute(stmt)
+    new_project = result.scalar_one()
+    await db.commit()
     
-    return model_to_schema(new_project)
+    return model_response(Project.model_validate(new_project))
 
 
 @router.put("/api/projects/{project_id}", response_model=Project)
-def update_project(project_id: str, updates: ProjectUpdate, db: Session = Depends(get_db)):
+async def update_project(project_id: str, updates: ProjectUpdate, db: AsyncSession = Depends(get_db)):
     """
     プロジェクトを更新
     
@@ -113,43 +135,26 @@ def update_project(project_id: str, updates: ProjectUpdate, db: Session = Depend
     Raises:
         HTTPException: プロジェクトが見つからない場合
     """
-    project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
+    project = await db.get(ProjectModel, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     # 更新処理(Noneでないフィールドのみ)
-    if updates.title is not None:
-        project.title = updates.title
-    if updates.description is not None:
-        project.description = updates.description
-    if updates.goal is not None:
-        project.goal = updates.goal
-    if updates.status is not None:
-        project.status = updates.status
-    if updates.targetEndDate is not None:
-        project.target_end_date = updates.targetEndDate
-    if updates.tags is not None:
-        project.tags = json.dumps(updates.tags)
-    if updates.color is not None:
-        project.color = updates.color
-    if updates.context is not None:
-        project.context = json.dumps({
-            "motivation": updates.context.motivation,
-            "weeklyHours": updates.context.weeklyHours,
-            "constraints": updates.context.constraints,
-            "resources": updates.context.resources
-        })
-    
-    project.updated_at = datetime.now().isoformat()
-    
-    db.commit()
-    db.refresh(project)
-    
-    return model_to_schema(project)
+    for field, value in updates.model_dump(exclude_unset=True, by_alias=True).items():
+        if value is None:
+            continue
+        setattr(project, UPDATE_FIELD_MAP[field], value)
+    
+    project.updated_at = utcnow()
+    
+    await db.commit()
+    await db.refresh(project)
+    
+    return model_response(Project.model_validate(project))
 
 
 @router.delete("/api/projects/{project_id}")
-def delete_project(project_id: str, db: Session = Depends(get_db)):
+async def delete_project(project_id: str, db: AsyncSession = Depends(get_db)):
     """
     プロジェクトを削除(カスケード削除)
     
@@ -164,49 +169,16 @@ def delete_project(project_id: str, db: Session = Depends(get_db)):
     Raises:
         HTTPException: プロジェクトが見つからない場合
     """
-    project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
+    # SQLiteでは外部キー制約が無効のため、子を読み込んでORMのカスケードで削除する
+    project = await db.get(
+        ProjectModel,
+        project_id,
+        options=[selectinload(ProjectModel.milestones), selectinload(ProjectModel.tasks)],
+    )
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    db.delete(project)
-    db.commit()
+    await db.delete(project)
+    await db.commit()
     
     return {"message": "Project deleted successfully"}
-
-
-def model_to_schema(model: ProjectModel) -> Project:
-    """
-    ORMモデルをPydanticスキーマに変換
-    
-    Args:
-        model: ProjectModelインスタンス
-        
-    Returns:
-        Project: Pydanticスキーマ
-    """
-    # コンテキストをパース
-    context = None
-    if model.context:
-        try:
-            context_data = json.loads(model.context)
-            from app.models.schemas import ProjectContext
-            context = ProjectContext(**context_data)
-        except (json.JSONDecodeError, TypeError):
-            pass
-    
-    return Project(
-        id=model.id,
-        userId=model.user_id,
-        title=model.title,
-        description=model.description,
-        goal=model.goal,
-        status=model.status,
-        startDate=model.start_date,
-        targetEndDate=model.target_end_date,
-        actualEndDate=model.actual_end_date,
-        tags=json.loads(model.tags) if model.tags else [],
-        color=model.color,
-        context=context,
-        createdAt=model.created_at,
-        updatedAt=model.updated_at
-    )
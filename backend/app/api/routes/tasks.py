@@ -4,25 +4,104 @@
 タスクのCRUD操作を提供するAPIエンドポイント
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from pydantic import TypeAdapter
 from typing import List, Optional
-from app.core.database import get_db, TaskModel
+from app.core.database import (
+    get_conn,
+    get_db,
+    TaskModel,
+    TaskTagModel,
+    TaskDependencyModel,
+    TaskBlockerModel,
+    utcnow,
+)
+from app.core.ids import new_id
+from app.core.etag import cache_headers, list_etag, not_modified
+from app.core.responses import list_response, model_response
 from app.models.schemas import Task, TaskCreate, TaskUpdate
-from datetime import datetime
-import uuid
-import json
 
 
 router = APIRouter()
 
+# 一覧レスポンスのシリアライザー(スキーマの構築は起動時に1回だけ行う)
+TASK_LIST_ADAPTER = TypeAdapter(List[Task])
+
+# 更新リクエストのフィールド名とカラム名の対応
+UPDATE_FIELD_MAP = {
+    "title": "title",
+    "description": "description",
+    "status": "status",
+    "priority": "priority",
+    "dueDate": "due_date",
+    "estimatedHours": "estimated_hours",
+    "dependencies": "dependencies",
+    "tags": "tags",
+    "isToday": "is_today",
+}
+
+# 更新時に重複を除くリスト項目(同じ値は1件にまとめる)
+LIST_FIELDS = frozenset({"dependencies", "tags"})
+
+# 関連テーブルに保存するリスト項目 (レスポンスのフィールド名, テーブル, 値のカラム)
+LINK_TABLES = (
+    ("tags", TaskTagModel.__table__, TaskTagModel.__table__.c.tag),
+    ("dependencies", TaskDependencyModel.__table__, TaskDependencyModel.__table__.c.depends_on_id),
+    ("blocked_by", TaskBlockerModel.__table__, TaskBlockerModel.__table__.c.blocked_by_id),
+)
+
+
+def _unique(values: list[str]) -> list[str]:
+    """順序を保ったまま重複を除去"""
+    return list(dict.fromkeys(values))
+
+
+async def _fetch_task_lists(conn: AsyncConnection, task_ids: list[str], *criteria) -> dict[str, dict[str, list[str]]]:
+    """
+    タスクのタグ・依存関係・ブロック元を関連テーブルからまとめて取得
+    
+    IDを1件ずつバインドせず、一覧と同じ絞り込み条件のサブクエリで対象を指定します。
+    (件数が多くてもSQLiteのバインド変数の上限に達しない)
+    
+    Args:
+        conn: データベースコネクション
+        task_ids: 一覧で取得したタスクIDのリスト
+        *criteria: 一覧取得と同じ絞り込み条件
+        
+    Returns:
+        タスクIDごとの {フィールド名: 値のリスト}(登録順)
+    """
+    lists: dict[str, dict[str, list[str]]] = {
+        task_id: {field: [] for field, _, _ in LINK_TABLES} for task_id in task_ids
+    }
+    if not task_ids:
+        return lists
+    
+    # テーブルごとに1回のクエリで取得する
+    task_id_subquery = select(TaskModel.id).where(*criteria)
+    for field, table, value_column in LINK_TABLES:
+        result = await conn.execute(
+            select(table.c.task_id, value_column)
+            .where(table.c.task_id.in_(task_id_subquery))
+            .order_by(table.c.task_id, table.c.position)
+        )
+        for task_id, value in result:
+            # 一覧の取得後に追加されたタスクの行は無視する
+            if task_id in lists:
+                lists[task_id][field].append(value)
+    return lists
+
 
 @router.get("/api/tasks", response_model=List[Task])
-def get_tasks(
+async def get_tasks(
+    request: Request,
     project_id: Optional[str] = None,
     milestone_id: Optional[str] = None,
     status: Optional[str] = None,
-    db: Session = Depends(get_db)
+    tag: Optional[str] = None,
+    conn: AsyncConnection = Depends(get_conn)
 ):
     """
     タスクを取得
@@ -31,25 +110,40 @@ def get_tasks(
         project_id: プロジェクトID(オプション)
         milestone_id: マイルストーンID(オプション)
         status: ステータスフィルター(オプション)
+        tag: タグフィルター(オプション)
         
     Returns:
-        List[Task]: タスクのリスト
+        List[Task]: タスクのリスト(変更がない場合は304)
     """
-    query = db.query(TaskModel)
-    
+    criteria = []
     if project_id:
-        query = query.filter(TaskModel.project_id == project_id)
+        criteria.append(TaskModel.project_id == project_id)
     if milestone_id:
-        query = query.filter(TaskModel.milestone_id == milestone_id)
+        criteria.append(TaskModel.milestone_id == milestone_id)
     if status:
-        query = query.filter(TaskModel.status == status)
+        criteria.append(TaskModel.status == status)
+    if tag:
+        criteria.append(TaskModel.tag_links.any(TaskTagModel.tag == tag))
+    
+    # 前回から変更がなければ本体を返さない
+    etag = await list_etag(conn, TaskModel, *criteria)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    # 読み取りのみのため、ORMを介さずテーブルの行を直接取得する
+    stmt = select(TaskModel.__table__).where(*criteria)
     
-    tasks = query.all()
-    return [model_to_schema(t) for t in tasks]
+    result = await conn.execute(stmt)
+    rows = result.mappings().all()
+    lists = await _fetch_task_lists(conn, [row["id"] for row in rows], *criteria)
+    tasks = [{**row, **lists[row["id"]]} for row in rows]
+    # 検証済みのデータを直接返し、FastAPIによるレスポンスの再検証を省略する
+    return list_response(TASK_LIST_ADAPTER, tasks, headers=cache_headers(etag))
 
 
 @router.get("/api/tasks/{task_id}", response_model=Task)
-def get_task(task_id: str, db: Session = Depends(get_db)):
+async def get_task(task_id: str, db: AsyncSession = Depends(get_db)):
     """
     特定のタスクを取得
     
@@ -62,14 +156,14 @@ def get_task(task_id: str, db: Session = Depends(get_db)):
     Raises:
         HTTPException: タスクが見つからない場合
     """
-    task = db.query(TaskModel).filter(TaskModel.id == task_id).first()
+    task = await db.get(TaskModel, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    return model_to_schema(task)
+    return model_response(Task.model_validate(task))
 
 
 @router.post("/api/tasks", response_model=Task)
-def create_task(task: TaskCreate, db: Session = Depends(get_db)):
+async def create_task(task: TaskCreate, db: AsyncSession = Depends(get_db)):
     """
     新規タスクを作成
     
@@ -79,38 +173,37 @@ def create_task(task: TaskCreate, db: Session = Depends(get_db)):
     Returns:
         Task: 作成されたタスク
     """
-    now = datetime.now().isoformat()
-    
     new_task = TaskModel(
-        id=str(uuid.uuid4()),
-        project_id=task.projectId,
-        milestone_id=task.milestoneId,
-        parent_task_id=task.parentTaskId,
+        id=new_id(),
+        project_id=task.project_id,
+        milestone_id=task.milestone_id,
+        parent_task_id=task.parent_task_id,
         title=task.title,
         description=task.description,
         status=task.status,
         priority=task.priority,
-        due_date=task.dueDate,
-        start_date=task.startDate,
-        estimated_hours=task.estimatedHours,
-        actual_hours=task.actualHours,
-        dependencies=json.dumps(task.dependencies),
-        blocked_by=json.dumps(task.blockedBy),
-        tags=json.dumps(task.tags),
-        is_today=task.isToday,
-        created_at=now,
-        updated_at=now
+        due_date=task.due_date,
+        start_date=task.start_date,
+        estimated_hours=task.estimated_hours,
+        actual_hours=task.actual_hours,
+        # 空のリストでもコレクションを初期化するため、関連オブジェクトを直接渡す
+        # (association_proxy経由では空リストの場合に未ロード扱いになり、参照時に遅延ロードが走る)
+        dependency_links=[TaskDependencyModel(depends_on_id=i) for i in _unique(task.dependencies)],
+        blocker_links=[TaskBlockerModel(blocked_by_id=i) for i in _unique(task.blocked_by)],
+        tag_links=[TaskTagModel(tag=t) for t in _unique(task.tags)],
+        is_today=task.is_today
     )
     
+    # タグなどの関連テーブルにも書き込むため、ユニットオブワークでまとめてINSERTする
+    # (DB側で設定する日時はRETURNINGで取得されるので、コミット後の再読み込みは不要)
     db.add(new_task)
-    db.commit()
-    db.refresh(new_task)
+    await db.commit()
     
-    return model_to_schema(new_task)
+    return model_response(Task.model_validate(new_task))
 
 
 @router.put("/api/tasks/{task_id}", response_model=Task)
-def update_task(task_id: str, updates: TaskUpdate, db: Session = Depends(get_db)):
+async def update_task(task_id: str, updates: TaskUpdate, db: AsyncSession = Depends(get_db)):
     """
     タスクを更新
     
@@ -124,46 +217,35 @@ def update_task(task_id: str, updates: TaskUpdate, db: Session = Depends(get_db)
     Raises:
         HTTPException: タスクが見つからない場合
     """
-    task = db.query(TaskModel).filter(TaskModel.id == task_id).first()
+    task = await db.get(TaskModel, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
     # 更新処理(Noneでないフィールドのみ)
-    if updates.title is not None:
-        task.title = updates.title
-    if updates.description is not None:
-        task.description = updates.description
+    for field, value in updates.model_dump(exclude_unset=True, by_alias=True).items():
+        if value is None:
+            continue
+        setattr(task, UPDATE_FIELD_MAP[field], _unique(value) if field in LIST_FIELDS else value)
+    
     if updates.status is not None:
-        task.status = updates.status
         # 完了状態になった場合、完了日時を記録
         if updates.status == 'done' and not task.completed_at:
-            task.completed_at = datetime.now().isoformat()
+            task.completed_at = utcnow()
         # 未完了に戻した場合、完了日時をクリア
         elif updates.status != 'done' and task.completed_at:
             task.completed_at = None
-    if updates.priority is not None:
-        task.priority = updates.priority
-    if updates.dueDate is not None:
-        task.due_date = updates.dueDate
-    if updates.estimatedHours is not None:
-        task.estimated_hours = updates.estimatedHours
-    if updates.dependencies is not None:
-        task.dependencies = json.dumps(updates.dependencies)
-    if updates.tags is not None:
-        task.tags = json.dumps(updates.tags)
-    if updates.isToday is not None:
-        task.is_today = updates.isToday
     
-    task.updated_at = datetime.now().isoformat()
+    # タグなど関連テーブルだけの変更でも更新日時を進める
+    task.updated_at = utcnow()
     
-    db.commit()
-    db.refresh(task)
+    await db.commit()
+    await db.refresh(task)
     
-    return model_to_schema(task)
+    return model_response(Task.model_validate(task))
 
 
 @router.delete("/api/tasks/{task_id}")
-def delete_task(task_id: str, db: Session = Depends(get_db)):
+async def delete_task(task_id: str, db: AsyncSession = Depends(get_db)):
     """
     タスクを削除
     
@@ -176,44 +258,11 @@ def delete_task(task_id: str, db: Session = Depends(get_db)):
     Raises:
         HTTPException: タスクが見つからない場合
     """
-    task = db.query(TaskModel).filter(TaskModel.id == task_id).first()
+    task = await db.get(TaskModel, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    db.delete(task)
-    db.commit()
+    await db.delete(task)
+    await db.commit()
     
     return {"message": "Task deleted successfully"}
-
-
-def model_to_schema(model: TaskModel) -> Task:
-    """
-    ORMモデルをPydanticスキーマに変換
-    
-    Args:
-        model: TaskModelインスタンス
-        
-    Returns:
-        Task: Pydanticスキーマ
-    """
-    return Task(
-        id=model.id,
-        projectId=model.project_id,
-        milestoneId=model.milestone_id,
-        parentTaskId=model.parent_task_id,
-        title=model.title,
-        description=model.description,
-        status=model.status,
-        priority=model.priority,
-        dueDate=model.due_date,
-        startDate=model.start_date,
-        estimatedHours=model.estimated_hours,
-        actualHours=model.actual_hours,
-        dependencies=json.loads(model.dependencies) if model.dependencies else [],
-        blockedBy=json.loads(model.blocked_by) if model.blocked_by else [],
-        tags=json.loads(model.tags) if model.tags else [],
-        isToday=model.is_today,
-        createdAt=model.created_at,
-        updatedAt=model.updated_at,
-        completedAt=model.completed_at
-    )
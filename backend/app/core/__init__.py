@@ -5,14 +5,17 @@
 """
 
 from app.core.config import settings
-from app.core.database import engine, SessionLocal, get_db
+from app.core.database import engine, SessionLocal, async_engine, AsyncSessionLocal, get_db, init_db
 from app.core.ai import get_kernel, initialize_kernel
 
 __all__ = [
     "settings",
     "engine",
     "SessionLocal",
+    "async_engine",
+    "AsyncSessionLocal",
     "get_db",
+    "init_db",
     "get_kernel",
     "initialize_kernel",
 ]
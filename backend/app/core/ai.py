@@ -4,26 +4,37 @@ AI/Semantic Kernel設定
 OpenAIとSemantic Kernelの初期化と管理
 """
 
+from fastapi import Request
 from semantic_kernel import Kernel
-from semantic_kernel.connectors.ai.open_ai import OpenAIChatCompletion
+from semantic_kernel.connectors.ai.open_ai import OpenAIChatCompletion, OpenAITextEmbedding
 from app.core.config import settings
+from app.plugins.task_management import TaskManagementPlugin
 
 
+# タスク管理プラグインの登録名
+TASK_PLUGIN_NAME = "TaskManagement"
+
 # グローバルKernelインスタンス
 _kernel: Kernel | None = None
+_task_plugin: TaskManagementPlugin | None = None
 
 
 def initialize_kernel() -> Kernel:
     """
     Semantic Kernelを初期化
     
+    初期化済みの場合は同じインスタンスを返します(サービスやプラグインは作り直さない)。
+    
     Returns:
         Kernel: 初期化されたSemantic Kernelインスタンス
         
     Raises:
         ValueError: OpenAI APIキーが設定されていない場合
     """
-    global _kernel
+    global _kernel, _task_plugin
+    
+    if _kernel is not None:
+        return _kernel
     
     if not settings.openai_api_key:
         raise ValueError("OPENAI_API_KEY が .env ファイルに設定されていません")
@@ -41,13 +52,30 @@ def initialize_kernel() -> Kernel:
         )
     )
     
+    # 埋め込み(セマンティックキャッシュ用)
+    kernel.add_service(
+        OpenAITextEmbedding(
+            service_id="embedding",
+            ai_model_id=settings.openai_embedding_model,
+            api_key=settings.openai_api_key
+        )
+    )
+    
+    # タスク管理プラグイン(アクションはリクエストごとのバッファに蓄積される)
+    task_plugin = TaskManagementPlugin()
+    kernel.add_plugin(task_plugin, plugin_name=TASK_PLUGIN_NAME)
+    
     _kernel = kernel
+    _task_plugin = task_plugin
     return kernel
 
 
-def get_kernel() -> Kernel:
+def get_kernel(request: Request) -> Kernel:
     """
-    初期化済みのKernelインスタンスを取得
+    起動時に初期化したKernelインスタンスを取得(FastAPIの依存関係として使用)
+    
+    Args:
+        request: リクエスト(app.state.kernel を参照)
     
     Returns:
         Kernel: Semantic Kernelインスタンス
@@ -55,6 +83,22 @@ def get_kernel() -> Kernel:
     Raises:
         RuntimeError: Kernelが初期化されていない場合
     """
-    if _kernel is None:
+    kernel = getattr(request.app.state, "kernel", None)
+    if kernel is None:
+        raise RuntimeError("Kernel が初期化されていません。initialize_kernel() を先に呼び出してください。")
+    return kernel
+
+
+def get_task_plugin() -> TaskManagementPlugin:
+    """
+    Kernelに登録済みのタスク管理プラグインを取得(FastAPIの依存関係として使用)
+    
+    Returns:
+        TaskManagementPlugin: タスク管理プラグイン
+        
+    Raises:
+        RuntimeError: Kernelが初期化されていない場合
+    """
+    if _task_plugin is None:
         raise RuntimeError("Kernel が初期化されていません。initialize_kernel() を先に呼び出してください。")
-    return _kernel
+    return _task_plugin
@@ -0,0 +1,139 @@
+"""
+セマンティックキャッシュ
+
+言い回しが違うだけの同じ質問("タスクを一覧して" / "todoを見せて"など)に対して、
+過去のAI応答を再利用するためのインメモリキャッシュ
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
+
+import numpy as np
+
+
+@dataclass(slots=True)
+class _CacheEntry:
+    """キャッシュの1エントリ"""
+    context_key: str
+    embedding: np.ndarray
+    response_text: str
+
+
+class SemanticCache:
+    """
+    埋め込みベクトルのコサイン類似度で応答を引き当てるLRUキャッシュ
+
+    同じ文脈(システムプロンプトと会話履歴)の中で、
+    類似度が閾値以上のプロンプトがあればその応答を返します。
+    上限を超えた場合は最も長く使われていないエントリから削除します。
+
+    Attributes:
+        threshold: キャッシュヒットとみなすコサイン類似度の下限
+        max_entries: 保持するエントリ数の上限
+    """
+
+    def __init__(self, threshold: float, max_entries: int):
+        """
+        キャッシュを初期化
+
+        Args:
+            threshold: キャッシュヒットとみなすコサイン類似度の下限
+            max_entries: 保持するエントリ数の上限
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, _CacheEntry] = OrderedDict()
+        self._next_id = 0
+        # 文脈のキーごとのエントリ数(埋め込みを生成する前に、検索する意味があるかを判定する)
+        self._context_counts: dict[str, int] = {}
+
+    @staticmethod
+    def context_key(*parts: str) -> str:
+        """
+        プロンプト以外の入力(システムプロンプト・会話履歴など)からキーを生成
+
+        Args:
+            *parts: 応答に影響する文字列
+
+        Returns:
+            文脈を識別するハッシュ文字列
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def has_context(self, context_key: str) -> bool:
+        """
+        指定した文脈のエントリが1件以上あるかを判定
+
+        Args:
+            context_key: 文脈のキー
+
+        Returns:
+            エントリがある場合はTrue
+        """
+        return context_key in self._context_counts
+
+    def lookup(self, context_key: str, embedding: np.ndarray) -> str | None:
+        """
+        類似したプロンプトの応答を検索
+
+        Args:
+            context_key: 文脈のキー
+            embedding: プロンプトの埋め込みベクトル
+
+        Returns:
+            キャッシュされた応答(見つからない場合はNone)
+        """
+        query = self._normalize(embedding)
+        best_id, best_score = None, self.threshold
+        for entry_id, entry in self._entries.items():
+            if entry.context_key != context_key:
+                continue
+            score = float(np.dot(entry.embedding, query))
+            if score >= best_score:
+                best_id, best_score = entry_id, score
+
+        if best_id is None:
+            return None
+        self._entries.move_to_end(best_id)
+        return self._entries[best_id].response_text
+
+    def store(self, context_key: str, embedding: np.ndarray, response_text: str) -> None:
+        """
+        応答をキャッシュに追加
+
+        Args:
+            context_key: 文脈のキー
+            embedding: プロンプトの埋め込みベクトル
+            response_text: AIからの応答
+        """
+        self._entries[self._next_id] = _CacheEntry(
+            context_key=context_key,
+            embedding=self._normalize(embedding),
+            response_text=response_text,
+        )
+        self._next_id += 1
+        self._context_counts[context_key] = self._context_counts.get(context_key, 0) + 1
+        while len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            remaining = self._context_counts[evicted.context_key] - 1
+            if remaining:
+                self._context_counts[evicted.context_key] = remaining
+            else:
+                del self._context_counts[evicted.context_key]
+
+    def clear(self) -> None:
+        """キャッシュを全て削除"""
+        self._entries.clear()
+        self._context_counts.clear()
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        """単位ベクトルに正規化(内積がそのままコサイン類似度になる)"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
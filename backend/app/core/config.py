@@ -6,7 +6,7 @@
 
 import os
 from pathlib import Path
-from functools import lru_cache
+from functools import cached_property, lru_cache
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -29,9 +29,15 @@ class Settings(BaseSettings):
     app_version: str = "0.1.0"
     debug: bool = False
     
+    # サーバー設定(python -m app.main で起動する場合)
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    server_workers: int = 0  # ワーカープロセス数(0の場合はCPU数。debug時は1つでリロードする)
+    
     # OpenAI設定
     openai_api_key: str
     openai_model: str = "gpt-4o-mini"
+    openai_embedding_model: str = "text-embedding-3-small"
     
     # データベース設定
     db_type: str = "sqlite"  # sqlite or postgresql
@@ -40,6 +46,11 @@ class Settings(BaseSettings):
     db_user: str = ""
     db_password: str = ""
     db_name: str = "project_companion.db"
+    db_pool_size: int = 10  # 常時保持するコネクション数
+    db_max_overflow: int = 20  # pool_sizeを超えて一時的に確保できるコネクション数
+    db_pool_recycle: int = 1800  # コネクションを再作成するまでの秒数
+    db_slow_query_ms: int = 100  # この時間を超えたクエリをログに出力
+    db_auto_migrate: bool = True  # 起動時にテーブル作成・スキーマ変更を行う(事前に済ませた場合はfalse)
     
     # CORS設定
     cors_origins: list[str] = ["http://localhost:5173"]
@@ -49,12 +60,18 @@ class Settings(BaseSettings):
     ai_temperature: float = 0.7
     chat_history_limit: int = 5  # 保持する会話履歴の数
     
-    @property
+    # セマンティックキャッシュ設定
+    semantic_cache_enabled: bool = True
+    semantic_cache_threshold: float = 0.87  # キャッシュヒットとみなすコサイン類似度
+    semantic_cache_max_entries: int = 1000
+    
+    @cached_property
     def database_url(self) -> str:
         """
         データベース接続URLを生成
         
         SQLiteまたはPostgreSQLの接続URLを返す
+        (初回のアクセス時に1回だけ生成し、データディレクトリの作成もその時だけ行う)
         
         Returns:
             データベース接続URL
@@ -69,6 +86,21 @@ class Settings(BaseSettings):
             # PostgreSQLの場合
             return f"postgresql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
     
+    @cached_property
+    def async_database_url(self) -> str:
+        """
+        非同期ドライバ用のデータベース接続URLを生成
+        
+        SQLiteはaiosqlite、PostgreSQLはasyncpgを使用するURLを返す
+        
+        Returns:
+            非同期データベース接続URL
+        """
+        if self.db_type == "sqlite":
+            return self.database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+        else:
+            return self.database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -5,14 +5,69 @@ SQLAlchemyを使用したデータベース接続の管理
 プロジェクト、マイルストーン、タスクのテーブル定義
 """
 
-from sqlalchemy import create_engine, Column, String, Integer, Float, Text, Boolean, ForeignKey
-from sqlalchemy.orm import sessionmaker, Session, declarative_base
-from typing import Generator
+from sqlalchemy import create_engine, event, Column, String, Integer, Float, Text, Boolean, Date, ForeignKey, Index, JSON
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.orm import sessionmaker, declarative_base, relationship
+from sqlalchemy.ext.associationproxy import association_proxy
+from sqlalchemy.ext.orderinglist import ordering_list
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncConnection, AsyncSession
+from typing import AsyncGenerator
+import logging
+import time
 from app.core.config import settings
+from app.core.migrations import run_migrations
+from app.core.serialization import json_dumps, json_loads
+from app.core.types import UTCDateTime
+
+logger = logging.getLogger(__name__)
 
 # ベースクラスの作成
 Base = declarative_base()
 
+
+class utcnow(FunctionElement):
+    """
+    現在時刻(UTC)を返すSQL式
+
+    SQLiteの CURRENT_TIMESTAMP は秒単位のため、ミリ秒まで記録できる式に置き換えます。
+    """
+    type = UTCDateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow, "sqlite")
+def _compile_utcnow_sqlite(element, compiler, **kw) -> str:
+    return "STRFTIME('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+@compiles(utcnow)
+def _compile_utcnow(element, compiler, **kw) -> str:
+    return "CURRENT_TIMESTAMP"
+
+
+# JSONを保存するカラムの型(PostgreSQLではバイナリ形式のJSONBを使う)
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+
+def _created_at_column() -> Column:
+    """作成日時カラム(DB側で現在時刻を設定)"""
+    return Column(UTCDateTime(), nullable=False, default=utcnow(), server_default=utcnow())
+
+
+def _updated_at_column() -> Column:
+    """更新日時カラム(DB側で作成・更新時の現在時刻を設定)"""
+    return Column(
+        UTCDateTime(),
+        nullable=False,
+        default=utcnow(),
+        server_default=utcnow(),
+        onupdate=utcnow(),
+    )
+
 # ========================================
 # テーブル定義
 # ========================================
@@ -38,8 +93,18 @@ class ProjectModel(Base):
         context: プロジェクトのコンテキスト情報(JSON)
         created_at: 作成日時
         updated_at: 更新日時
+        milestones: プロジェクトに属するマイルストーン
+        tasks: プロジェクトに属するタスク
     """
     __tablename__ = 'projects'
+    # user_id単体の検索は複合インデックスの先頭列で賄う
+    __table_args__ = (
+        Index('ix_projects_user_status', 'user_id', 'status'),
+        # タグの包含検索(tags @> '["foo"]')用のGINインデックス(PostgreSQLのみ)
+        Index('ix_projects_tags_gin', 'tags', postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
+    # DB側で設定した日時をINSERT/UPDATEのRETURNINGで取得する
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(String, primary_key=True)
     user_id = Column(String, nullable=False, default='default_user')  # マルチユーザー対応用
@@ -47,14 +112,28 @@ class ProjectModel(Base):
     description = Column(Text)
     goal = Column(String, nullable=False)
     status = Column(String, default='planning')
-    start_date = Column(String)
-    target_end_date = Column(String)
-    actual_end_date = Column(String)
-    tags = Column(Text)  # JSON配列として保存
+    start_date = Column(Date)
+    target_end_date = Column(Date)
+    actual_end_date = Column(Date)
+    tags = Column(JSONType)  # JSON配列
     color = Column(String)
-    context = Column(Text)  # JSON
-    created_at = Column(String, nullable=False)
-    updated_at = Column(String, nullable=False)
+    context = Column(JSONType)
+    created_at = _created_at_column()
+    updated_at = _updated_at_column()
+    # 子のコレクションは必要な処理でだけ selectinload() で読み込む
+    # 未ロードの子の削除はDBのON DELETEに任せ(passive_deletes)、読み込み済みの子はORMが削除する
+    milestones = relationship(
+        "MilestoneModel",
+        back_populates="project",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    tasks = relationship(
+        "TaskModel",
+        back_populates="project",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
 
 
 class MilestoneModel(Base):
@@ -74,19 +153,29 @@ class MilestoneModel(Base):
         completed_at: 完了日時
         created_at: 作成日時
         updated_at: 更新日時
+        project: 所属するプロジェクト
+        tasks: マイルストーンに属するタスク
     """
     __tablename__ = 'milestones'
+    # プロジェクト単位の一覧はorder_num順に返すため、並び順まで含めた複合インデックスにする
+    __table_args__ = (
+        Index('ix_milestones_proj_order', 'project_id', 'order_num'),
+    )
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(String, primary_key=True)
     project_id = Column(String, ForeignKey('projects.id', ondelete='CASCADE'), nullable=False)
     title = Column(String, nullable=False)
     description = Column(Text)
     order_num = Column(Integer)
-    due_date = Column(String)
+    due_date = Column(Date)
     status = Column(String, default='todo')
-    completed_at = Column(String)
-    created_at = Column(String, nullable=False)
-    updated_at = Column(String, nullable=False)
+    completed_at = Column(UTCDateTime())
+    created_at = _created_at_column()
+    updated_at = _updated_at_column()
+    project = relationship("ProjectModel", back_populates="milestones")
+    # マイルストーンを削除してもタスクは残す(ON DELETE SET NULL)ため、delete-orphanにはしない
+    tasks = relationship("TaskModel", back_populates="milestone", passive_deletes=True)
 
 
 class TaskModel(Base):
@@ -108,35 +197,128 @@ class TaskModel(Base):
         start_date: 開始予定日
         estimated_hours: 見積もり時間
         actual_hours: 実際にかかった時間
-        dependencies: 依存するタスクのIDリスト(JSON)
-        blocked_by: ブロックしているタスクのIDリスト(JSON)
-        tags: タグのJSON配列
+        dependencies: 依存するタスクのIDリスト(task_dependencies)
+        blocked_by: ブロックしているタスクのIDリスト(task_blockers)
+        tags: タグのリスト(task_tags)
         is_today: 今日のタスクフラグ
         created_at: 作成日時
         updated_at: 更新日時
         completed_at: 完了日時
+        project: 所属するプロジェクト
+        milestone: 所属するマイルストーン
+        parent: 親タスク
+        subtasks: サブタスクのリスト
     """
     __tablename__ = 'tasks'
+    # project_id単体・project_id+statusの検索は複合インデックスの先頭列で賄う
+    __table_args__ = (
+        Index('ix_tasks_proj_status_due', 'project_id', 'status', 'due_date'),
+    )
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(String, primary_key=True)
     project_id = Column(String, ForeignKey('projects.id', ondelete='CASCADE'), nullable=False)
-    milestone_id = Column(String, ForeignKey('milestones.id', ondelete='SET NULL'))
-    parent_task_id = Column(String, ForeignKey('tasks.id', ondelete='CASCADE'))
+    milestone_id = Column(String, ForeignKey('milestones.id', ondelete='SET NULL'), index=True)
+    parent_task_id = Column(String, ForeignKey('tasks.id', ondelete='CASCADE'), index=True)
     title = Column(String, nullable=False)
     description = Column(Text)
-    status = Column(String, default='todo')
+    status = Column(String, default='todo', index=True)
     priority = Column(String, default='medium')
-    due_date = Column(String)
-    start_date = Column(String)
+    due_date = Column(Date, index=True)
+    start_date = Column(Date)
     estimated_hours = Column(Float)
     actual_hours = Column(Float)
-    dependencies = Column(Text)  # JSON配列
-    blocked_by = Column(Text)  # JSON配列
-    tags = Column(Text)  # JSON配列
-    is_today = Column(Boolean, default=False)
-    created_at = Column(String, nullable=False)
-    updated_at = Column(String, nullable=False)
-    completed_at = Column(String)
+    is_today = Column(Boolean, default=False, index=True)
+    created_at = _created_at_column()
+    updated_at = _updated_at_column()
+    completed_at = Column(UTCDateTime())
+    project = relationship("ProjectModel", back_populates="tasks")
+    milestone = relationship("MilestoneModel", back_populates="tasks")
+    parent = relationship("TaskModel", back_populates="subtasks", remote_side=[id])
+    subtasks = relationship("TaskModel", back_populates="parent", passive_deletes=True)
+
+    # リスト項目は関連テーブルに正規化し、文字列のリストとして扱う
+    # (SQLiteでは外部キー制約が無効のため、削除はORM側のカスケードで行う)
+    tag_links = relationship(
+        "TaskTagModel",
+        order_by="TaskTagModel.position",
+        collection_class=ordering_list("position"),
+        cascade="all, delete-orphan",
+        lazy="selectin",
+    )
+    dependency_links = relationship(
+        "TaskDependencyModel",
+        order_by="TaskDependencyModel.position",
+        collection_class=ordering_list("position"),
+        cascade="all, delete-orphan",
+        lazy="selectin",
+    )
+    blocker_links = relationship(
+        "TaskBlockerModel",
+        order_by="TaskBlockerModel.position",
+        collection_class=ordering_list("position"),
+        cascade="all, delete-orphan",
+        lazy="selectin",
+    )
+    tags = association_proxy("tag_links", "tag", creator=lambda tag: TaskTagModel(tag=tag))
+    dependencies = association_proxy(
+        "dependency_links", "depends_on_id",
+        creator=lambda task_id: TaskDependencyModel(depends_on_id=task_id),
+    )
+    blocked_by = association_proxy(
+        "blocker_links", "blocked_by_id",
+        creator=lambda task_id: TaskBlockerModel(blocked_by_id=task_id),
+    )
+
+
+class TaskTagModel(Base):
+    """
+    タスクのタグテーブル
+    
+    Attributes:
+        task_id: タスクのID
+        tag: タグ
+        position: タスク内での並び順
+    """
+    __tablename__ = 'task_tags'
+    
+    task_id = Column(String, ForeignKey('tasks.id', ondelete='CASCADE'), primary_key=True)
+    tag = Column(String, primary_key=True, index=True)
+    position = Column(Integer, nullable=False, default=0)
+
+
+class TaskDependencyModel(Base):
+    """
+    タスクの依存関係テーブル
+    
+    依存先はフロントエンド側にしか存在しないタスクも指せるよう、外部キーにはしない
+    
+    Attributes:
+        task_id: タスクのID
+        depends_on_id: 依存するタスクのID
+        position: タスク内での並び順
+    """
+    __tablename__ = 'task_dependencies'
+    
+    task_id = Column(String, ForeignKey('tasks.id', ondelete='CASCADE'), primary_key=True)
+    depends_on_id = Column(String, primary_key=True, index=True)
+    position = Column(Integer, nullable=False, default=0)
+
+
+class TaskBlockerModel(Base):
+    """
+    タスクのブロッカーテーブル
+    
+    Attributes:
+        task_id: タスクのID
+        blocked_by_id: ブロックしているタスクのID
+        position: タスク内での並び順
+    """
+    __tablename__ = 'task_blockers'
+    
+    task_id = Column(String, ForeignKey('tasks.id', ondelete='CASCADE'), primary_key=True)
+    blocked_by_id = Column(String, primary_key=True, index=True)
+    position = Column(Integer, nullable=False, default=0)
 
 
 class PlanningSessionModel(Base):
@@ -155,14 +337,15 @@ class PlanningSessionModel(Base):
         updated_at: 更新日時
     """
     __tablename__ = 'planning_sessions'
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(String, primary_key=True)
     project_id = Column(String, ForeignKey('projects.id', ondelete='SET NULL'))
     stage = Column(String, default='initial')
-    collected_info = Column(Text)  # JSON
-    proposed_structure = Column(Text)  # JSON
-    created_at = Column(String, nullable=False)
-    updated_at = Column(String, nullable=False)
+    collected_info = Column(JSONType)
+    proposed_structure = Column(JSONType)
+    created_at = _created_at_column()
+    updated_at = _updated_at_column()
 
 
 # ========================================
@@ -172,31 +355,155 @@ class PlanningSessionModel(Base):
 # データベースエンジンの作成
 # SQLiteの場合、check_same_threadをFalseに設定
 connect_args = {"check_same_thread": False} if settings.db_type == "sqlite" else {}
-engine = create_engine(settings.database_url, connect_args=connect_args)
 
-# テーブルを作成(既に存在する場合はスキップ)
-Base.metadata.create_all(bind=engine)
+# コネクションプール設定
+# デフォルト(pool_size=5, max_overflow=10)では同時リクエストが増えると枯渇するため拡張
+if settings.db_type == "sqlite":
+    # aiosqliteの既定はNullPool(接続のたびにファイルを開き直し、PRAGMAも再実行される)のため、接続を使い回す
+    # StaticPool(単一接続の共有)は、複数のセッションが同時にトランザクションを持つと干渉するため使わない
+    pool_options = {
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+    }
+else:
+    pool_options = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_pre_ping": True,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+
+
+# SQLite接続時に設定するPRAGMA
+# - journal_mode=WAL: 書き込み中でも読み込みがブロックされない
+# - synchronous=NORMAL: WALではコミットごとのfsyncを省略しても破損しない(電源断時に直近のコミットが失われる可能性のみ)
+# - temp_store=MEMORY: 一時テーブル・ソートをメモリ上で行う
+# - mmap_size: 256MBまでメモリマップドI/Oで読み込む
+# - cache_size: ページキャッシュを約64MBにする(負の値はKB単位)
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-64000",
+)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    SQLite接続時にPRAGMAを設定
+    """
+    cursor = dbapi_connection.cursor()
+    for pragma in _SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    """クエリの実行開始時刻を記録"""
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
 
-# セッションファクトリーの作成
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    """実行時間が閾値を超えたクエリをログに出力"""
+    elapsed_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+    if elapsed_ms > settings.db_slow_query_ms:
+        logger.warning("Slow query (%.1f ms): %s", elapsed_ms, statement)
+
+
+def _register_engine_events(target: Engine) -> None:
+    """
+    エンジンにイベントリスナーを登録
+
+    Args:
+        target: 登録先のエンジン(非同期エンジンの場合は sync_engine)
+    """
+    if target.url.drivername.startswith("sqlite"):
+        event.listen(target, "connect", _set_sqlite_pragmas)
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+
+
+# JSONカラムの変換もorjsonで行う
+json_options = {"json_serializer": json_dumps, "json_deserializer": json_loads}
+
+# 同期エンジン(テーブル作成やスクリプトからの利用向け)
+engine = create_engine(settings.database_url, connect_args=connect_args, **json_options)
+_register_engine_events(engine)
+
+def init_db() -> None:
+    """
+    テーブルを作成し、既存テーブルへのスキーマ変更を適用
+
+    複数ワーカーで起動する場合は、ワーカーの起動前に1回だけ実行してください。
+    各処理は冪等で、既に適用済みの場合は何も変わりません。
+    """
+    # テーブルを作成(既に存在する場合はスキップ)
+    Base.metadata.create_all(bind=engine)
+
+    # 既存テーブルへのスキーマ変更(インデックス追加など)を適用
+    run_migrations(engine, Base.metadata)
+
+
+# 同期セッションファクトリーの作成
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 非同期エンジン(APIリクエストの処理用)
+# イベントループをブロックせずにDBアクセスを行う
+async_engine = create_async_engine(
+    settings.async_database_url,
+    connect_args=connect_args,
+    **json_options,
+    **pool_options,
+)
+_register_engine_events(async_engine.sync_engine)
 
-def get_db() -> Generator[Session, None, None]:
+# 非同期セッションファクトリーの作成
+# コミット後もレスポンス生成で属性を参照するため、expire_on_commitは無効化
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
-    データベースセッションを取得する依存性注入関数
+    非同期データベースセッションを取得する依存性注入関数
     
     Yields:
-        Session: SQLAlchemyデータベースセッション
+        AsyncSession: SQLAlchemy非同期データベースセッション
         
     Example:
         ```python
         @app.get("/items")
-        def get_items(db: Session = Depends(get_db)):
-            return db.query(Item).all()
+        async def get_items(db: AsyncSession = Depends(get_db)):
+            result = await db.execute(select(Item))
+            return result.scalars().all()
         ```
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+async def get_conn() -> AsyncGenerator[AsyncConnection, None]:
+    """
+    読み取り専用の非同期コネクションを取得する依存性注入関数
+    
+    ORMのセッション(アイデンティティマップ・オートフラッシュ・変更追跡)を使わず、
+    Coreのクエリを直接実行します。一覧取得などの書き込みを行わないエンドポイント向けです。
+    
+    Yields:
+        AsyncConnection: SQLAlchemy非同期コネクション
+        
+    Example:
+        ```python
+        @app.get("/items")
+        async def get_items(conn: AsyncConnection = Depends(get_conn)):
+            result = await conn.execute(select(ItemModel.__table__))
+            return result.all()
+        ```
+    """
+    async with async_engine.connect() as conn:
+        yield conn
@@ -0,0 +1,70 @@
+"""
+一覧APIのHTTPキャッシュ
+
+一覧の内容が変わっていない場合に 304 Not Modified を返すためのETagを生成する
+ETagは件数と最終更新日時の集計から求めるため、複数ワーカーで起動しても一致する
+"""
+
+import hashlib
+
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+# ブラウザのキャッシュは毎回ETagで再検証させる
+# (更新直後の一覧取得で古い内容を返さないため。変更がなければ304で本体は送らない)
+CACHE_CONTROL = "private, no-cache"
+
+
+async def list_etag(db: AsyncConnection | AsyncSession, model, *criteria) -> str:
+    """
+    一覧の対象行の件数と最終更新日時からETagを生成
+
+    Args:
+        db: データベースコネクションまたはセッション
+        model: 一覧の対象テーブルのモデル(updated_atカラムを持つ)
+        *criteria: 一覧取得と同じ絞り込み条件
+
+    Returns:
+        弱いETag(W/"...")
+    """
+    stmt = select(func.count(), func.max(model.updated_at)).select_from(model).where(*criteria)
+    count, last_updated = (await db.execute(stmt)).one()
+
+    digest = hashlib.blake2b(
+        f"{model.__tablename__}:{count}:{last_updated}".encode("utf-8"),
+        digest_size=8,
+    )
+    return f'W/"{digest.hexdigest()}"'
+
+
+def cache_headers(etag: str) -> dict[str, str]:
+    """
+    一覧レスポンスに付けるキャッシュ用ヘッダー
+
+    Args:
+        etag: 現在の一覧のETag
+
+    Returns:
+        ETag・Cache-Controlヘッダー
+    """
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(request: Request, etag: str) -> Response | None:
+    """
+    クライアントのキャッシュが有効なら304レスポンスを返す
+
+    Args:
+        request: リクエスト(If-None-Matchヘッダーを参照)
+        etag: 現在の一覧のETag
+
+    Returns:
+        304レスポンス(キャッシュが古い場合はNone)
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {tag.strip() for tag in if_none_match.split(",")}
+        if "*" in candidates or etag in candidates:
+            return Response(status_code=304, headers=cache_headers(etag))
+    return None
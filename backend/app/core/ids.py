@@ -0,0 +1,61 @@
+"""
+ID生成
+
+主キー用の時系列順に並ぶUUID(UUIDv7, RFC 9562)を生成する
+ランダムなUUIDv4と違い、新しい行がインデックスの末尾に追加されるため挿入が速い
+"""
+
+import os
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_seq = 0
+
+
+def uuid7() -> uuid.UUID:
+    """
+    UUIDv7を生成
+
+    先頭48ビットがミリ秒単位のUNIX時刻、続く12ビットが同一ミリ秒内の連番です。
+    同じミリ秒内に生成したIDも生成順に並びます。
+
+    Returns:
+        uuid.UUID: UUIDv7
+    """
+    global _last_ms, _last_seq
+
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms = now_ms
+            _last_seq = int.from_bytes(os.urandom(2), "big") & 0x07FF
+        else:
+            # 同一ミリ秒(または時計の巻き戻り)では連番を進め、溢れたら時刻を1ms進める
+            _last_seq += 1
+            if _last_seq > 0x0FFF:
+                _last_ms += 1
+                _last_seq = 0
+        timestamp_ms, seq = _last_ms, _last_seq
+
+    rand_b = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    value = (
+        (timestamp_ms & ((1 << 48) - 1)) << 80
+        | 0x7 << 76
+        | seq << 64
+        | 0b10 << 62
+        | rand_b
+    )
+    return uuid.UUID(int=value)
+
+
+def new_id() -> str:
+    """
+    主キー用の新しいIDを文字列で生成
+
+    Returns:
+        str: UUIDv7の文字列表現
+    """
+    return str(uuid7())
@@ -0,0 +1,327 @@
+"""
+データベースのスキーマ移行
+
+create_all() は未作成のテーブルしか作成しないため、
+既存データベースに対するインデックス追加やデータ移行などの変更を起動時に適用する
+各処理は冪等で、何度実行しても結果は変わらない
+"""
+
+from datetime import date, datetime, timezone
+
+from sqlalchemy import JSON, Column, Date, MetaData, String, inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.serialization import json_loads
+from app.core.types import UTCDateTime
+
+
+# タスクのJSON配列カラムと移行先の関連テーブル (カラム名, テーブル名, 値のカラム名)
+_TASK_LIST_COLUMNS = (
+    ("tags", "task_tags", "tag"),
+    ("dependencies", "task_dependencies", "depends_on_id"),
+    ("blocked_by", "task_blockers", "blocked_by_id"),
+)
+
+
+def ensure_indexes(conn: Connection, metadata: MetaData) -> None:
+    """
+    テーブル定義にあるインデックスのうち、未作成のものを作成
+
+    Args:
+        conn: データベース接続
+        metadata: テーブル定義を含むメタデータ
+    """
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _decode_id_list(value: str | None) -> list[str]:
+    """
+    JSON配列のカラム値を重複のない文字列リストに変換(不正な値は空リスト)
+
+    Args:
+        value: カラムの値
+
+    Returns:
+        文字列のリスト
+    """
+    if not value:
+        return []
+    try:
+        items = json_loads(value)
+    except ValueError:
+        return []
+    if not isinstance(items, list):
+        return []
+    return list(dict.fromkeys(str(item) for item in items))
+
+
+def migrate_task_list_columns(conn: Connection, metadata: MetaData) -> None:
+    """
+    tasksテーブルのJSON配列カラム(tags, dependencies, blocked_by)を関連テーブルに移行
+
+    移行した行のJSONカラムはNULLにするため、再実行しても二重に登録されない
+
+    Args:
+        conn: データベース接続
+        metadata: テーブル定義を含むメタデータ
+    """
+    columns = {column["name"] for column in inspect(conn).get_columns("tasks")}
+
+    for column_name, table_name, value_column in _TASK_LIST_COLUMNS:
+        if column_name not in columns:
+            continue
+
+        rows = conn.execute(
+            text(f"SELECT id, {column_name} FROM tasks WHERE {column_name} IS NOT NULL")
+        ).all()
+        links = [
+            {"task_id": task_id, value_column: value, "position": position}
+            for task_id, raw in rows
+            for position, value in enumerate(_decode_id_list(raw))
+        ]
+        if links:
+            conn.execute(metadata.tables[table_name].insert(), links)
+        if rows:
+            conn.execute(text(f"UPDATE tasks SET {column_name} = NULL WHERE {column_name} IS NOT NULL"))
+
+
+def _to_utc(value: str) -> datetime | None:
+    """
+    ISO形式の日時文字列をUTCの日時に変換
+
+    タイムゾーンのない値は、旧バージョンが datetime.now() で書き込んだ
+    ローカル時刻として扱います。
+
+    Args:
+        value: カラムの値
+
+    Returns:
+        UTCの日時(日時として読み込めない場合はNone)
+    """
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    # タイムゾーンのない値に astimezone() を使うと、ローカル時刻として変換される
+    return parsed.astimezone(timezone.utc)
+
+
+def _convert_legacy_timestamps(conn: Connection, table_name: str, column: Column, is_sqlite: bool) -> None:
+    """
+    旧バージョンで文字列として保存されていた日時をUTCに変換
+
+    SQLiteではローカル時刻のISO形式('T'区切り)の値だけを対象にし、
+    SQLAlchemyの保存形式(空白区切り・タイムゾーンなし)で書き戻すため、
+    変換済みの値が再び対象になることはありません。
+    PostgreSQLでは型の変更前に全ての値を対象にし、オフセット付きのISO形式に書き換えます。
+    日時として読み込めない値は、NULLを許すカラムではNULL、NOT NULLのカラムでは現在時刻にします。
+
+    Args:
+        conn: データベース接続
+        table_name: テーブル名
+        column: 対象のカラム
+        is_sqlite: SQLiteかどうか
+    """
+    condition = f"{column.name} LIKE '____-__-__T%'" if is_sqlite else f"{column.name} IS NOT NULL"
+    rows = conn.execute(text(f"SELECT id, {column.name} FROM {table_name} WHERE {condition}")).all()
+    now = datetime.now(timezone.utc)
+    updates = []
+    for row_id, raw in rows:
+        value = _to_utc(raw)
+        if value is None and not column.nullable:
+            value = now
+        if value is None:
+            stored = None
+        elif is_sqlite:
+            stored = value.strftime("%Y-%m-%d %H:%M:%S.%f")
+        else:
+            stored = value.isoformat()
+        updates.append({"id": row_id, "value": stored})
+    if updates:
+        conn.execute(text(f"UPDATE {table_name} SET {column.name} = :value WHERE id = :id"), updates)
+
+
+def migrate_timestamp_columns(conn: Connection, metadata: MetaData) -> None:
+    """
+    文字列で保存していた日時カラムをUTCの日時型に移行
+
+    旧バージョンはローカル時刻をISO形式で保存していたため、先にUTCへ変換します。
+    PostgreSQLではカラムの型を TIMESTAMP WITH TIME ZONE に変更します。
+    SQLiteは型を持たないため、SQLAlchemyの保存形式(空白区切り)のUTCで書き戻し、
+    文字列比較での並び順を新しい値と一致させます。
+    日時として読み込めない値は、NULLを許すカラムではNULL、NOT NULLのカラムでは現在時刻にします。
+
+    Args:
+        conn: データベース接続
+        metadata: テーブル定義を含むメタデータ
+    """
+    inspector = inspect(conn)
+    is_sqlite = conn.dialect.name == "sqlite"
+
+    for table in metadata.sorted_tables:
+        existing = {column["name"]: column["type"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if not isinstance(column.type, UTCDateTime) or column.name not in existing:
+                continue
+
+            if is_sqlite:
+                _convert_legacy_timestamps(conn, table.name, column, is_sqlite)
+                # 日付として読み込めない値(空文字・自由入力の文字列)はNULL(NOT NULLのカラムでは現在時刻)にする
+                replacement = "NULL" if column.nullable else "STRFTIME('%Y-%m-%d %H:%M:%f', 'now')"
+                conn.execute(text(
+                    f"UPDATE {table.name} SET {column.name} = {replacement} "
+                    f"WHERE {column.name} NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'"
+                ))
+            elif isinstance(existing[column.name], String):
+                # 読み込めない値は先に置き換えているため、型の変更は失敗しない
+                _convert_legacy_timestamps(conn, table.name, column, is_sqlite)
+                conn.execute(text(
+                    f"ALTER TABLE {table.name} ALTER COLUMN {column.name} "
+                    f"TYPE TIMESTAMP WITH TIME ZONE USING {column.name}::timestamptz"
+                ))
+                if column.server_default is not None:
+                    conn.execute(text(
+                        f"ALTER TABLE {table.name} ALTER COLUMN {column.name} SET DEFAULT CURRENT_TIMESTAMP"
+                    ))
+
+
+def _truncate_legacy_dates(conn: Connection, table_name: str, column_name: str) -> None:
+    """
+    文字列で保存されていた日付を 'YYYY-MM-DD' に揃える
+
+    先頭10文字を日付として読み込み、読み込めない値(空文字・自由入力の文字列)はNULLにします。
+
+    Args:
+        conn: データベース接続
+        table_name: テーブル名
+        column_name: カラム名
+    """
+    rows = conn.execute(text(
+        f"SELECT id, {column_name} FROM {table_name} WHERE {column_name} IS NOT NULL"
+    )).all()
+    updates = []
+    for row_id, raw in rows:
+        try:
+            stored = date.fromisoformat(raw[:10]).isoformat()
+        except ValueError:
+            stored = None
+        if stored != raw:
+            updates.append({"id": row_id, "value": stored})
+    if updates:
+        conn.execute(text(f"UPDATE {table_name} SET {column_name} = :value WHERE id = :id"), updates)
+
+
+def migrate_date_columns(conn: Connection, metadata: MetaData) -> None:
+    """
+    文字列で保存していた日付カラムをDate型に移行
+
+    期限・開始日などは暦日のため、時刻やタイムゾーンは変換せずに切り捨て、
+    書き込まれたときの日付('YYYY-MM-DD')をそのまま残します。
+    PostgreSQLではカラムの型を DATE に変更します。
+    SQLite・PostgreSQLとも、日時形式の値は日付部分だけに揃え、日付として読み込めない値はNULLにします。
+
+    Args:
+        conn: データベース接続
+        metadata: テーブル定義を含むメタデータ
+    """
+    inspector = inspect(conn)
+    is_sqlite = conn.dialect.name == "sqlite"
+
+    for table in metadata.sorted_tables:
+        existing = {column["name"]: column["type"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if not isinstance(column.type, Date) or column.name not in existing:
+                continue
+
+            if is_sqlite:
+                conn.execute(text(
+                    f"UPDATE {table.name} SET {column.name} = NULL "
+                    f"WHERE {column.name} NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'"
+                ))
+                conn.execute(text(
+                    f"UPDATE {table.name} SET {column.name} = SUBSTR({column.name}, 1, 10) "
+                    f"WHERE LENGTH({column.name}) > 10"
+                ))
+            elif isinstance(existing[column.name], String):
+                # 不正な値が1行でもあると型の変更が失敗するため、先に日付部分だけに揃える
+                _truncate_legacy_dates(conn, table.name, column.name)
+                conn.execute(text(
+                    f"ALTER TABLE {table.name} ALTER COLUMN {column.name} "
+                    f"TYPE DATE USING {column.name}::date"
+                ))
+
+
+def _clear_invalid_json(conn: Connection, table_name: str, column_name: str) -> None:
+    """
+    JSONとして読み込めない値(空文字を含む)をNULLにする
+
+    Args:
+        conn: データベース接続
+        table_name: テーブル名
+        column_name: カラム名
+    """
+    rows = conn.execute(text(
+        f"SELECT id, {column_name} FROM {table_name} WHERE {column_name} IS NOT NULL"
+    )).all()
+    invalid_ids = []
+    for row_id, raw in rows:
+        try:
+            json_loads(raw)
+        except ValueError:
+            invalid_ids.append({"id": row_id})
+    if invalid_ids:
+        conn.execute(text(f"UPDATE {table_name} SET {column_name} = NULL WHERE id = :id"), invalid_ids)
+
+
+def migrate_json_columns(conn: Connection, metadata: MetaData) -> None:
+    """
+    JSON文字列をTextで保存していたカラムをJSON型に移行
+
+    PostgreSQLではカラムの型を JSONB に変更します。
+    SQLiteはJSONを文字列のまま保存するため型は変えず、
+    読み込み時のデコードで失敗しないよう空文字・不正なJSONをNULLにします。
+
+    Args:
+        conn: データベース接続
+        metadata: テーブル定義を含むメタデータ
+    """
+    inspector = inspect(conn)
+    is_sqlite = conn.dialect.name == "sqlite"
+
+    for table in metadata.sorted_tables:
+        existing = {column["name"]: column["type"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if not isinstance(column.type, JSON) or column.name not in existing:
+                continue
+
+            if is_sqlite:
+                conn.execute(text(
+                    f"UPDATE {table.name} SET {column.name} = NULL "
+                    f"WHERE {column.name} IS NOT NULL AND json_valid({column.name}) = 0"
+                ))
+            elif isinstance(existing[column.name], String):
+                # 不正な値が1行でもあると型の変更が失敗するため、先にNULLにする
+                _clear_invalid_json(conn, table.name, column.name)
+                conn.execute(text(
+                    f"ALTER TABLE {table.name} ALTER COLUMN {column.name} "
+                    f"TYPE JSONB USING {column.name}::jsonb"
+                ))
+
+
+def run_migrations(engine: Engine, metadata: MetaData) -> None:
+    """
+    既存データベースにスキーマ変更を適用
+
+    Args:
+        engine: 同期データベースエンジン
+        metadata: テーブル定義を含むメタデータ
+    """
+    with engine.begin() as conn:
+        # GINインデックスなどは移行後の型を前提にするため、型の変更を先に行う
+        migrate_timestamp_columns(conn, metadata)
+        migrate_date_columns(conn, metadata)
+        migrate_json_columns(conn, metadata)
+        ensure_indexes(conn, metadata)
+        migrate_task_list_columns(conn, metadata)
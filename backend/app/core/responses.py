@@ -0,0 +1,68 @@
+"""
+レスポンスクラス
+
+orjson・pydantic-coreでJSONを生成するレスポンスを提供する
+"""
+
+from typing import Any
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    orjsonでシリアライズするJSONレスポンス
+
+    datetime・UUID・numpy配列はorjsonが直接変換し、
+    それ以外の未対応の型は文字列に変換します。
+    エンドポイントから直接返すと、FastAPIによるレスポンスの再検証と
+    jsonable_encoder の処理を省略できます。
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=str,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+
+
+def model_response(model: BaseModel) -> Response:
+    """
+    pydanticモデルをそのままJSONにしたレスポンスを生成
+
+    model_dump_json はpydantic-core(Rust)でJSONを直接生成するため、
+    Pythonの辞書を経由するシリアライズを省略できます。
+
+    Args:
+        model: 検証済みのレスポンススキーマ
+
+    Returns:
+        キーをcamelCaseにしたJSONレスポンス
+    """
+    return Response(model.model_dump_json(by_alias=True), media_type="application/json")
+
+
+def list_response(adapter: TypeAdapter, rows: Any, headers: dict[str, str] | None = None) -> Response:
+    """
+    行の一覧をスキーマで検証し、そのままJSONにしたレスポンスを生成
+
+    アダプターはモジュールの読み込み時に1回だけ作成し、使い回してください。
+
+    Args:
+        adapter: レスポンススキーマのリスト型のTypeAdapter(例: TypeAdapter(list[Task]))
+        rows: ORMインスタンス・Coreの行・辞書の一覧
+        headers: 追加するレスポンスヘッダー
+
+    Returns:
+        キーをcamelCaseにしたJSONレスポンス
+    """
+    return Response(
+        adapter.dump_json(adapter.validate_python(rows), by_alias=True),
+        media_type="application/json",
+        headers=headers,
+    )
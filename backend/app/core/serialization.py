@@ -0,0 +1,39 @@
+"""
+JSONシリアライズ
+
+DBのTextカラムやAI応答に埋め込むJSONの変換をorjsonで行う
+変換方法を変える場合はこのモジュールだけを修正する
+"""
+
+from typing import Any
+
+import orjson
+
+
+def json_dumps(value: Any) -> str:
+    """
+    値をJSON文字列に変換
+
+    Args:
+        value: 変換する値
+
+    Returns:
+        JSON文字列(非ASCII文字はエスケープしない)
+    """
+    return orjson.dumps(value).decode()
+
+
+def json_loads(value: str | bytes) -> Any:
+    """
+    JSON文字列をデコード
+
+    Args:
+        value: JSON文字列
+
+    Returns:
+        デコードした値
+
+    Raises:
+        ValueError: JSONとして不正な場合
+    """
+    return orjson.loads(value)
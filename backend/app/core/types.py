@@ -0,0 +1,36 @@
+"""
+カラム型
+
+バックエンドによって挙動が変わらないよう、値の変換方法を揃えたカラム型を定義する
+"""
+
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime
+from sqlalchemy.types import TypeDecorator
+
+
+class UTCDateTime(TypeDecorator):
+    """
+    UTCで保存・読み込みする日時型
+
+    SQLiteはタイムゾーンを保存できないため、書き込み時にUTCへ変換してから保存し、
+    読み込み時にUTCのタイムゾーン情報を付けて返します。
+    タイムゾーンのない値はUTCとして扱います。
+    """
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value: datetime | None, dialect) -> datetime | None:
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
+
+    def process_result_value(self, value: datetime | None, dialect) -> datetime | None:
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
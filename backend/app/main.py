@@ -4,28 +4,54 @@ AI Project Companion - メインアプリケーション
 個人開発者向けのタスク管理AIアシスタントのバックエンドAPI
 """
 
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
 from app.core.ai import initialize_kernel
+from app.core.database import async_engine, init_db
+from app.core.responses import ORJSONResponse
 from app.api.routes import chat_router, health_router
 from app.api.routes.projects import router as projects_router
 from app.api.routes.milestones import router as milestones_router
 from app.api.routes.tasks import router as tasks_router
 
 
+# ログ設定
+# フォーマットまではリクエスト処理側で行い、出力(I/O)はリスナースレッドに任せる
+_log_queue: queue.Queue = queue.Queue(-1)
+_queue_handler = QueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+log_listener = QueueListener(_log_queue, logging.StreamHandler())
+# python -m app.main で起動した場合、ワーカーではこのモジュールが2回読み込まれるため、
+# リスナーを起動する側(app.main)のハンドラーで置き換える
+logging.basicConfig(
+    level=logging.DEBUG if settings.debug else logging.INFO,
+    handlers=[_queue_handler],
+    force=True,
+)
+logger = logging.getLogger(__name__)
+
+
 # FastAPIアプリケーションの作成
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
-    description="AI-powered project management companion API"
+    description="AI-powered project management companion API",
+    # レスポンスのJSONシリアライズにorjsonを使用
+    default_response_class=ORJSONResponse,
 )
 
-# CORS設定
+# CORS設定(許可するオリジンは起動時に固定)
+CORS_ORIGINS = tuple(settings.cors_origins)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.cors_origins,
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -37,36 +63,41 @@ async def startup_event():
     """
     アプリケーション起動時の初期化処理
     
-    Semantic Kernelの初期化などを実行します。
+    ログ出力スレッドの開始やSemantic Kernelの初期化などを実行します。
     """
-    print("=" * 50)
-    print(f"🚀 {settings.app_name} v{settings.app_version} を起動中...")
-    print("=" * 50)
+    log_listener.start()
+    
+    # ワーカーごとに出力されるため、ログにはプロセスIDを含める
+    logger.info("🚀 %s v%s を起動中... (pid=%d)", settings.app_name, settings.app_version, os.getpid())
     
-    # Semantic Kernelの初期化
+    # テーブル作成・スキーマ変更(python -m app.main ではワーカーの起動前に済ませている)
+    if settings.db_auto_migrate:
+        init_db()
+    
+    # Semantic Kernelの初期化(全リクエストで同じインスタンスを使う)
     try:
-        initialize_kernel()
-        print("✅ Semantic Kernel を初期化しました")
+        app.state.kernel = initialize_kernel()
+        logger.info("✅ Semantic Kernel を初期化しました")
     except Exception as e:
-        print(f"❌ Semantic Kernel の初期化に失敗: {e}")
+        logger.error("❌ Semantic Kernel の初期化に失敗: %s", e)
         raise
     
-    print(f"✅ OpenAI モデル: {settings.openai_model}")
-    print(f"✅ データベース: {settings.database_url}")
-    print(f"✅ CORS Origins: {settings.cors_origins}")
-    print("=" * 50)
-    print("🎉 アプリケーションの起動が完了しました!")
-    print("=" * 50)
+    logger.info("✅ OpenAI モデル: %s", settings.openai_model)
+    logger.info("✅ データベース: %s", settings.database_url)
+    logger.info("✅ CORS Origins: %s", CORS_ORIGINS)
+    logger.info("🎉 アプリケーションの起動が完了しました!")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """
     アプリケーション終了時のクリーンアップ処理
+    
+    データベースのコネクションプールを解放します。
     """
-    print("=" * 50)
-    print("👋 アプリケーションを終了します...")
-    print("=" * 50)
+    logger.info("👋 アプリケーションを終了します... (pid=%d)", os.getpid())
+    await async_engine.dispose()
+    log_listener.stop()
 
 
 # ルーターの登録
@@ -78,10 +109,27 @@ app.include_router(tasks_router, tags=["tasks"])
 
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
-    )
+    
+    run_options = {
+        "host": settings.server_host,
+        "port": settings.server_port,
+        # uvloopはWindows非対応のため、Windowsでは標準のasyncioループを使用
+        "loop": "asyncio" if sys.platform == "win32" else "uvloop",
+        "http": "httptools",
+    }
+    if settings.debug:
+        # 開発時は1プロセスでコード変更を自動リロード
+        run_options.update(reload=True, log_level="debug")
+    else:
+        # 本番はCPUコアごとにワーカーを起動
+        run_options.update(
+            workers=settings.server_workers or os.cpu_count() or 1,
+            log_level="warning",
+        )
+    
+    # テーブル作成・スキーマ変更はここで1回だけ行い、各ワーカー(環境変数を引き継ぐ)では省略する
+    init_db()
+    os.environ["DB_AUTO_MIGRATE"] = "false"
+    uvicorn.run("app.main:app", **run_options)
@@ -9,6 +9,7 @@ from app.models.schemas import (
     ChatMessage,
     ChatRequest,
     ChatResponse,
+    _PLANNING_MODELS,
 )
 
 __all__ = [
@@ -16,4 +17,17 @@ __all__ = [
     "ChatMessage",
     "ChatRequest",
     "ChatResponse",
+    "PlanningSessionInfo",
+    "ProposedStructure",
+    "PlanningSession",
+    "PlanningChatRequest",
+    "PlanningChatResponse",
 ]
+
+
+def __getattr__(name: str):
+    """プランニング用スキーマは参照された時に読み込む(対象は schemas._PLANNING_MODELS と共通)"""
+    if name in _PLANNING_MODELS:
+        from app.models import planning
+        return getattr(planning, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,117 @@
+"""
+プランニング用のPydanticスキーマ定義
+
+質問駆動型プランニングのセッション・チャットで使用するデータモデルを定義
+"""
+
+from datetime import datetime
+from typing import List, Optional
+
+from app.models.schemas import (
+    APIModel,
+    MilestoneCreate,
+    ProjectCreate,
+    RecentChatHistory,
+    TaskCreate,
+)
+
+
+class PlanningSessionInfo(APIModel):
+    """
+    プランニングセッションで収集した情報
+    
+    質問駆動型プランニング中にユーザーから引き出した情報を保存
+    
+    Attributes:
+        dream_title: やりたいことのタイトル
+        purpose: 目的・なぜやりたいのか
+        deadline: 希望する完了期限
+        weekly_hours: 週あたりの作業可能時間
+        skills: 現在持っているスキル
+        constraints: 制約事項
+        existing_resources: 既存のリソース
+    """
+    dream_title: Optional[str] = None
+    purpose: Optional[str] = None
+    deadline: Optional[str] = None
+    weekly_hours: Optional[float] = None
+    skills: List[str] = []
+    constraints: List[str] = []
+    existing_resources: List[str] = []
+
+
+class ProposedStructure(APIModel):
+    """
+    AIが提案したプロジェクト構造
+    
+    プランニングセッション中にAIが生成した
+    プロジェクト・マイルストーン・タスクの全体構造
+    
+    Attributes:
+        project: 提案するプロジェクト
+        milestones: 提案するマイルストーンのリスト
+        tasks: 提案するタスクのリスト
+    """
+    project: ProjectCreate
+    milestones: List[MilestoneCreate]
+    tasks: List[TaskCreate]
+
+
+class PlanningSession(APIModel):
+    """
+    プランニングセッション
+    
+    質問駆動型プランニングのセッション状態を管理
+    
+    Attributes:
+        id: セッションの一意識別子
+        project_id: 生成されたプロジェクトのID(確定後)
+        stage: プランニングの進行段階
+        collected_info: 収集した情報
+        proposed_structure: 提案された構造
+        created_at: 作成日時
+        updated_at: 更新日時
+    """
+    id: str
+    project_id: Optional[str] = None
+    stage: str  # initial, clarifying, structuring, tasking, completed
+    collected_info: PlanningSessionInfo
+    proposed_structure: Optional[ProposedStructure] = None
+    created_at: datetime
+    updated_at: datetime
+
+
+class PlanningChatRequest(APIModel):
+    """
+    プランニングチャットリクエスト
+    
+    質問駆動型プランニング用のチャットリクエスト
+    
+    Attributes:
+        session_id: セッションID(継続の場合)
+        message: ユーザーからのメッセージ
+        history: 会話履歴(直近50件まで)
+    """
+    session_id: Optional[str] = None
+    message: str
+    history: RecentChatHistory = []
+
+
+class PlanningChatResponse(APIModel):
+    """
+    プランニングチャットレスポンス
+    
+    質問駆動型プランニング用のチャットレスポンス
+    
+    Attributes:
+        session_id: セッションID
+        response: AIからの応答
+        stage: 現在のステージ
+        action: 次に実行すべきアクション
+        proposed_structure: 提案された構造(構造化ステージの場合)
+    """
+    session_id: str
+    response: str
+    stage: str
+    action: Optional[str] = None  # move_to_structuring, propose_structure, finalize
+    proposed_structure: Optional[ProposedStructure] = None
@@ -4,16 +4,55 @@ Pydanticスキーマ定義
 API リクエスト/レスポンスで使用するデータモデルを定義
 """
 
-from pydantic import BaseModel, Field
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel, BeforeValidator, Field, ConfigDict, AliasChoices, field_validator
+from pydantic.alias_generators import to_camel
+from typing import Annotated, Any, Optional, List
+from datetime import date, datetime
+
+
+# ========================================
+# 共通の基底クラス
+# ========================================
+
+class APIModel(BaseModel):
+    """
+    APIスキーマの基底クラス
+
+    フィールドはsnake_caseで定義し、JSONのキーはcamelCaseのエイリアスで入出力します。
+    ORMインスタンスの属性からも直接 model_validate できます。
+    シリアライズ時は by_alias=True を指定してcamelCaseのキーで出力してください。
+    """
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True,
+        from_attributes=True,
+        # スキーマの構築を初回利用時まで遅らせ、起動時間を短縮する
+        defer_build=True,
+    )
+
+
+def _as_list(value: Any) -> Any:
+    """
+    JSONカラムの配列や、関連テーブルの値のコレクションをリストに変換
+
+    Args:
+        value: ORMから読み込んだ値(リスト・コレクション・None)
+
+    Returns:
+        リスト(未設定の場合は空リスト)
+    """
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        return list(value)
+    return value
 
 
 # ========================================
 # Project関連
 # ========================================
 
-class ProjectContext(BaseModel):
+class ProjectContext(APIModel):
     """
     プロジェクトのコンテキスト情報
     
@@ -21,41 +60,41 @@ class ProjectContext(BaseModel):
     
     Attributes:
         motivation: プロジェクトに取り組む動機・目的
-        weeklyHours: 週あたりの作業可能時間
+        weekly_hours: 週あたりの作業可能時間
         constraints: 制約事項のリスト
         resources: 利用可能なリソースのリスト
     """
     motivation: Optional[str] = None
-    weeklyHours: Optional[float] = None
+    weekly_hours: Optional[float] = None
     constraints: List[str] = []
     resources: List[str] = []
 
 
-class ProjectBase(BaseModel):
+class ProjectBase(APIModel):
     """
     プロジェクトの基本情報
     
     プロジェクトの核となる情報を定義
     
     Attributes:
-        userId: プロジェクトの所有者ID(将来のマルチユーザー対応用)
+        user_id: プロジェクトの所有者ID(将来のマルチユーザー対応用)
         title: プロジェクトのタイトル
         description: プロジェクトの詳細説明
         goal: プロジェクトの目標
         status: プロジェクトの状態 ('planning', 'active', 'on_hold', 'completed', 'archived')
-        startDate: プロジェクト開始日
-        targetEndDate: 目標完了日
+        start_date: プロジェクト開始日
+        target_end_date: 目標完了日
         tags: タグのリスト
         color: UI表示用のカラーコード
         context: プロジェクトのコンテキスト情報
     """
-    userId: str = 'default_user'  # デフォルトユーザー(将来認証実装時に動的に変更)
+    user_id: str = 'default_user'  # デフォルトユーザー(将来認証実装時に動的に変更)
     title: str
     description: Optional[str] = None
     goal: str
     status: str = 'planning'
-    startDate: Optional[str] = None
-    targetEndDate: Optional[str] = None
+    start_date: Optional[date] = None
+    target_end_date: Optional[date] = None
     tags: List[str] = []
     color: Optional[str] = None
     context: Optional[ProjectContext] = None
@@ -70,7 +109,7 @@ class ProjectCreate(ProjectBase):
     pass
 
 
-class ProjectUpdate(BaseModel):
+class ProjectUpdate(APIModel):
     """
     プロジェクト更新リクエスト
     
@@ -81,7 +120,7 @@ class ProjectUpdate(BaseModel):
     description: Optional[str] = None
     goal: Optional[str] = None
     status: Optional[str] = None
-    targetEndDate: Optional[str] = None
+    target_end_date: Optional[date] = None
     tags: Optional[List[str]] = None
     color: Optional[str] = None
     context: Optional[ProjectContext] = None
@@ -95,39 +134,46 @@ class Project(ProjectBase):
     
     Attributes:
         id: プロジェクトの一意識別子
-        createdAt: 作成日時
-        updatedAt: 更新日時
-        actualEndDate: 実際の完了日
+        created_at: 作成日時
+        updated_at: 更新日時
+        actual_end_date: 実際の完了日
     """
     id: str
-    createdAt: str
-    updatedAt: str
-    actualEndDate: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    actual_end_date: Optional[date] = None
+
+    @field_validator("tags", mode="before")
+    @classmethod
+    def _decode_tags(cls, value: Any) -> Any:
+        """未設定のタグを空リストとして扱う"""
+        return _as_list(value)
 
 
 # ========================================
 # Milestone関連
 # ========================================
 
-class MilestoneBase(BaseModel):
+class MilestoneBase(APIModel):
     """
     マイルストーンの基本情報
     
     プロジェクトを構成する中間目標
     
     Attributes:
-        projectId: 所属するプロジェクトのID
+        project_id: 所属するプロジェクトのID
         title: マイルストーンのタイトル
         description: マイルストーンの詳細説明
         order: 表示順序
-        dueDate: 期限
+        due_date: 期限
         status: マイルストーンの状態 ('todo', 'in_progress', 'done')
     """
-    projectId: str
+    project_id: str
     title: str
     description: Optional[str] = None
-    order: int
-    dueDate: Optional[str] = None
+    # ORMではorder_numカラム
+    order: int = Field(validation_alias=AliasChoices("order", "order_num"))
+    due_date: Optional[date] = None
     status: str = 'todo'
 
 
@@ -140,7 +186,7 @@ class MilestoneCreate(MilestoneBase):
     pass
 
 
-class MilestoneUpdate(BaseModel):
+class MilestoneUpdate(APIModel):
     """
     マイルストーン更新リクエスト
     
@@ -150,7 +196,7 @@ class MilestoneUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
     order: Optional[int] = None
-    dueDate: Optional[str] = None
+    due_date: Optional[date] = None
     status: Optional[str] = None
 
 
@@ -162,58 +208,58 @@ class Milestone(MilestoneBase):
     
     Attributes:
         id: マイルストーンの一意識別子
-        createdAt: 作成日時
-        updatedAt: 更新日時
-        completedAt: 完了日時
+        created_at: 作成日時
+        updated_at: 更新日時
+        completed_at: 完了日時
     """
     id: str
-    createdAt: str
-    updatedAt: str
-    completedAt: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    completed_at: Optional[datetime] = None
 
 
 # ========================================
 # Task関連(拡張版)
 # ========================================
 
-class TaskBase(BaseModel):
+class TaskBase(APIModel):
     """
     タスクの基本情報(拡張版)
     
     プロジェクトやマイルストーンに紐づく具体的な作業単位
     
     Attributes:
-        projectId: 所属するプロジェクトのID
-        milestoneId: 所属するマイルストーンのID(オプショナル)
-        parentTaskId: 親タスクのID(サブタスクの場合)
+        project_id: 所属するプロジェクトのID
+        milestone_id: 所属するマイルストーンのID(オプショナル)
+        parent_task_id: 親タスクのID(サブタスクの場合)
         title: タスクのタイトル
         description: タスクの詳細説明
         status: タスクの状態 ('todo', 'in_progress', 'done', 'blocked')
         priority: タスクの優先度 ('high', 'medium', 'low')
-        dueDate: 期限
-        startDate: 開始予定日
-        estimatedHours: 見積もり時間
-        actualHours: 実際にかかった時間
+        due_date: 期限
+        start_date: 開始予定日
+        estimated_hours: 見積もり時間
+        actual_hours: 実際にかかった時間
         dependencies: 依存するタスクのIDリスト
-        blockedBy: ブロックしているタスクのIDリスト
+        blocked_by: ブロックしているタスクのIDリスト
         tags: タグのリスト
-        isToday: 今日のタスクフラグ
+        is_today: 今日のタスクフラグ
     """
-    projectId: str
-    milestoneId: Optional[str] = None
-    parentTaskId: Optional[str] = None
+    project_id: str
+    milestone_id: Optional[str] = None
+    parent_task_id: Optional[str] = None
     title: str
     description: Optional[str] = None
     status: str = 'todo'
     priority: str = 'medium'
-    dueDate: Optional[str] = None
-    startDate: Optional[str] = None
-    estimatedHours: Optional[float] = None
-    actualHours: Optional[float] = None
+    due_date: Optional[date] = None
+    start_date: Optional[date] = None
+    estimated_hours: Optional[float] = None
+    actual_hours: Optional[float] = None
     dependencies: List[str] = []
-    blockedBy: List[str] = []
+    blocked_by: List[str] = []
     tags: List[str] = []
-    isToday: bool = False
+    is_today: bool = False
 
 
 class TaskCreate(TaskBase):
@@ -225,7 +271,7 @@ class TaskCreate(TaskBase):
     pass
 
 
-class TaskUpdate(BaseModel):
+class TaskUpdate(APIModel):
     """
     タスク更新リクエスト
     
@@ -236,11 +282,11 @@ class TaskUpdate(BaseModel):
     description: Optional[str] = None
     status: Optional[str] = None
     priority: Optional[str] = None
-    dueDate: Optional[str] = None
-    estimatedHours: Optional[float] = None
+    due_date: Optional[date] = None
+    estimated_hours: Optional[float] = None
     dependencies: Optional[List[str]] = None
     tags: Optional[List[str]] = None
-    isToday: Optional[bool] = None
+    is_today: Optional[bool] = None
 
 
 class Task(TaskBase):
@@ -251,21 +297,27 @@ class Task(TaskBase):
     
     Attributes:
         id: タスクの一意識別子
-        createdAt: 作成日時
-        updatedAt: 更新日時
-        completedAt: 完了日時
+        created_at: 作成日時
+        updated_at: 更新日時
+        completed_at: 完了日時
     """
     id: str
-    createdAt: str
-    updatedAt: str
-    completedAt: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    completed_at: Optional[datetime] = None
+
+    @field_validator("dependencies", "blocked_by", "tags", mode="before")
+    @classmethod
+    def _decode_lists(cls, value: Any) -> Any:
+        """関連テーブルに保存されたリスト系の値をリストに変換"""
+        return _as_list(value)
 
 
 # ========================================
 # 既存のチャット関連(互換性維持)
 # ========================================
 
-class ChatMessage(BaseModel):
+class ChatMessage(APIModel):
     """
     チャットメッセージを表すモデル
     
@@ -277,21 +329,42 @@ class ChatMessage(BaseModel):
     content: str
 
 
-class ChatRequest(BaseModel):
+# 受け付ける会話履歴の最大件数(これより古いメッセージは検証前に破棄する)
+MAX_CHAT_HISTORY = 50
+
+
+def _keep_recent_history(value: Any) -> Any:
+    """会話履歴を直近の MAX_CHAT_HISTORY 件に切り詰める"""
+    if isinstance(value, list) and len(value) > MAX_CHAT_HISTORY:
+        return value[-MAX_CHAT_HISTORY:]
+    return value
+
+
+# 直近の MAX_CHAT_HISTORY 件だけを検証・保持する会話履歴
+RecentChatHistory = Annotated[
+    List[ChatMessage],
+    BeforeValidator(_keep_recent_history),
+    Field(max_length=MAX_CHAT_HISTORY),
+]
+
+
+class ChatRequest(APIModel):
     """
     チャットAPIへのリクエストモデル
     
     Attributes:
         message: ユーザーからの新しいメッセージ
-        tasks: 現在のタスクリスト(完全なTask型)
-        history: 過去の会話履歴
+        tasks: 現在のタスクリスト(フロントエンドのTask型のJSON)
+        history: 過去の会話履歴(直近50件まで)
     """
     message: str
-    tasks: list[Task] = []
-    history: list[ChatMessage] = []
+    # サーバーが発行したタスクをそのまま送り返すため、項目ごとの検証は行わない
+    # (プロンプトの作成で参照するのは id, title, status, priority のみ)
+    tasks: list[dict[str, Any]] = []
+    history: RecentChatHistory = []
 
 
-class ChatResponse(BaseModel):
+class ChatResponse(APIModel):
     """
     チャットAPIからのレスポンスモデル
     
@@ -305,102 +378,20 @@ class ChatResponse(BaseModel):
 # Planning Session関連
 # ========================================
 
-class PlanningSessionInfo(BaseModel):
-    """
-    プランニングセッションで収集した情報
-    
-    質問駆動型プランニング中にユーザーから引き出した情報を保存
-    
-    Attributes:
-        dreamTitle: やりたいことのタイトル
-        purpose: 目的・なぜやりたいのか
-        deadline: 希望する完了期限
-        weeklyHours: 週あたりの作業可能時間
-        skills: 現在持っているスキル
-        constraints: 制約事項
-        existingResources: 既存のリソース
-    """
-    dreamTitle: Optional[str] = None
-    purpose: Optional[str] = None
-    deadline: Optional[str] = None
-    weeklyHours: Optional[float] = None
-    skills: List[str] = []
-    constraints: List[str] = []
-    existingResources: List[str] = []
-
-
-class ProposedStructure(BaseModel):
-    """
-    AIが提案したプロジェクト構造
-    
-    プランニングセッション中にAIが生成した
-    プロジェクト・マイルストーン・タスクの全体構造
-    
-    Attributes:
-        project: 提案するプロジェクト
-        milestones: 提案するマイルストーンのリスト
-        tasks: 提案するタスクのリスト
-    """
-    project: ProjectCreate
-    milestones: List[MilestoneCreate]
-    tasks: List[TaskCreate]
-
-
-class PlanningSession(BaseModel):
-    """
-    プランニングセッション
-    
-    質問駆動型プランニングのセッション状態を管理
-    
-    Attributes:
-        id: セッションの一意識別子
-        projectId: 生成されたプロジェクトのID(確定後)
-        stage: プランニングの進行段階
-        collectedInfo: 収集した情報
-        proposedStructure: 提案された構造
-        createdAt: 作成日時
-        updatedAt: 更新日時
-    """
-    id: str
-    projectId: Optional[str] = None
-    stage: str  # initial, clarifying, structuring, tasking, completed
-    collectedInfo: PlanningSessionInfo
-    proposedStructure: Optional[ProposedStructure] = None
-    createdAt: str
-    updatedAt: str
-
-
-class PlanningChatRequest(BaseModel):
-    """
-    プランニングチャットリクエスト
-    
-    質問駆動型プランニング用のチャットリクエスト
-    
-    Attributes:
-        sessionId: セッションID(継続の場合)
-        message: ユーザーからのメッセージ
-        history: 会話履歴
-    """
-    sessionId: Optional[str] = None
-    message: str
-    history: List[ChatMessage] = []
-
-
-class PlanningChatResponse(BaseModel):
-    """
-    プランニングチャットレスポンス
-    
-    質問駆動型プランニング用のチャットレスポンス
-    
-    Attributes:
-        sessionId: セッションID
-        response: AIからの応答
-        stage: 現在のステージ
-        action: 次に実行すべきアクション
-        proposedStructure: 提案された構造(構造化ステージの場合)
-    """
-    sessionId: str
-    response: str
-    stage: str
-    action: Optional[str] = None  # move_to_structuring, propose_structure, finalize
-    proposedStructure: Optional[ProposedStructure] = None
+# プランニング用のスキーマは app.models.planning で定義し、参照された時に読み込む
+# (プランニング機能を使わないワーカーではスキーマを構築しない)
+_PLANNING_MODELS = frozenset({
+    "PlanningSessionInfo",
+    "ProposedStructure",
+    "PlanningSession",
+    "PlanningChatRequest",
+    "PlanningChatResponse",
+})
+
+
+def __getattr__(name: str) -> Any:
+    """プランニング用スキーマの遅延インポート(PEP 562)"""
+    if name in _PLANNING_MODELS:
+        from app.models import planning
+        return getattr(planning, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
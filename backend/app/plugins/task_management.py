@@ -4,31 +4,86 @@
 AIがタスクの作成・削除・完了・未完了・優先度変更を行うためのSemantic Kernelプラグイン
 """
 
+from contextvars import ContextVar, Token
+
 from semantic_kernel.functions import kernel_function
 
 
-class TaskManagementPlugin:
+class TaskActions:
     """
-    タスク管理用のSemantic Kernelネイティブプラグイン
+    1リクエスト分のタスク操作を蓄積するバッファ
     
-    AIがタスクの作成・削除・完了・未完了・優先度変更を行えるようにする機能を提供します。
-    各関数呼び出しの結果は内部リストに蓄積され、後でまとめて取得できます。
+    リクエストごとに生成されるため、__slots__ でインスタンス辞書を持たないようにしています。
     
     Attributes:
-        tasks_to_create: 作成するタスクのリスト
+        tasks_to_create: 作成するタスクの (タイトル, 優先度) のリスト
         tasks_to_delete: 削除するタスクIDのリスト
         tasks_to_complete: 完了にするタスクIDのリスト
         tasks_to_uncomplete: 未完了に戻すタスクIDのリスト
-        tasks_to_update_priority: 優先度を変更するタスクの情報リスト
+        tasks_to_update_priority: 優先度を変更するタスクの (タスクID, 優先度) のリスト
     """
+    __slots__ = (
+        "tasks_to_create",
+        "tasks_to_delete",
+        "tasks_to_complete",
+        "tasks_to_uncomplete",
+        "tasks_to_update_priority",
+    )
     
     def __init__(self):
-        """プラグインを初期化"""
-        self.tasks_to_create: list[dict] = []
+        """バッファを初期化"""
+        self.tasks_to_create: list[tuple[str, str]] = []
         self.tasks_to_delete: list[str] = []
         self.tasks_to_complete: list[str] = []
         self.tasks_to_uncomplete: list[str] = []
-        self.tasks_to_update_priority: list[dict] = []
+        self.tasks_to_update_priority: list[tuple[str, str]] = []
+
+
+# 優先度と日本語表記の対応(有効な優先度の判定にも使う)
+_PRIORITY_LABELS = {'high': '高', 'medium': '中', 'low': '低'}
+
+
+# リクエストごとのアクションバッファ
+# プラグインはKernelに一度だけ登録され、全リクエストで共有されるため、
+# 蓄積先はインスタンスではなくコンテキスト変数で切り替える
+_actions_ctx: ContextVar[TaskActions] = ContextVar("task_actions")
+
+
+class TaskManagementPlugin:
+    """
+    タスク管理用のSemantic Kernelネイティブプラグイン
+    
+    AIがタスクの作成・削除・完了・未完了・優先度変更を行えるようにする機能を提供します。
+    各関数呼び出しの結果はリクエストごとのバッファに蓄積され、後でまとめて取得できます。
+    リクエストの処理前に begin_actions() でバッファを用意し、処理後に end_actions() で破棄してください。
+    """
+    # インスタンスは状態を持たない(蓄積先はコンテキスト変数)
+    __slots__ = ()
+    
+    @staticmethod
+    def begin_actions() -> Token[TaskActions]:
+        """
+        現在のリクエスト用に空のアクションバッファを用意
+        
+        Returns:
+            end_actions() に渡すトークン
+        """
+        return _actions_ctx.set(TaskActions())
+    
+    @staticmethod
+    def end_actions(token: Token[TaskActions]) -> None:
+        """
+        begin_actions() で用意したバッファを破棄し、以前の状態に戻す
+        
+        Args:
+            token: begin_actions() が返したトークン
+        """
+        _actions_ctx.reset(token)
+    
+    @staticmethod
+    def _current_actions() -> TaskActions:
+        """現在のリクエストのアクションバッファを取得"""
+        return _actions_ctx.get()
     
     @kernel_function(
         name="create_task",
@@ -46,17 +101,13 @@ class TaskManagementPlugin:
             作成されたタスクの確認メッセージ
         """
         # 優先度のバリデーション
-        if priority not in ['high', 'medium', 'low']:
+        if priority not in _PRIORITY_LABELS:
             priority = 'medium'
             
-        task = {
-            "title": title,
-            "priority": priority
-        }
-        self.tasks_to_create.append(task)
+        actions = self._current_actions()
+        actions.tasks_to_create.append((title, priority))
         
-        # 優先度の日本語表記
-        priority_label = {'high': '高', 'medium': '中', 'low': '低'}[priority]
+        priority_label = _PRIORITY_LABELS[priority]
         return f"タスク「{title}」(優先度: {priority_label})を作成しました。"
     
     @kernel_function(
@@ -73,7 +124,8 @@ class TaskManagementPlugin:
         Returns:
             削除確認のメッセージ
         """
-        self.tasks_to_delete.append(task_id)
+        actions = self._current_actions()
+        actions.tasks_to_delete.append(task_id)
         return f"タスクID: {task_id} を削除リストに追加しました。"
     
     @kernel_function(
@@ -90,7 +142,8 @@ class TaskManagementPlugin:
         Returns:
             完了確認のメッセージ
         """
-        self.tasks_to_complete.append(task_id)
+        actions = self._current_actions()
+        actions.tasks_to_complete.append(task_id)
         return f"タスクID: {task_id} を完了状態にしました。"
     
     @kernel_function(
@@ -107,7 +160,8 @@ class TaskManagementPlugin:
         Returns:
             未完了化の確認メッセージ
         """
-        self.tasks_to_uncomplete.append(task_id)
+        actions = self._current_actions()
+        actions.tasks_to_uncomplete.append(task_id)
         return f"タスクID: {task_id} を未完了状態に戻しました。"
     
     @kernel_function(
@@ -126,21 +180,21 @@ class TaskManagementPlugin:
             優先度変更の確認メッセージ
         """
         # 優先度のバリデーション
-        if priority not in ['high', 'medium', 'low']:
+        if priority not in _PRIORITY_LABELS:
             return f"エラー: 優先度は 'high', 'medium', 'low' のいずれかを指定してください。"
         
-        self.tasks_to_update_priority.append({
-            "task_id": task_id,
-            "priority": priority
-        })
+        actions = self._current_actions()
+        actions.tasks_to_update_priority.append((task_id, priority))
         
-        # 優先度の日本語表記
-        priority_label = {'high': '高', 'medium': '中', 'low': '低'}[priority]
+        priority_label = _PRIORITY_LABELS[priority]
         return f"タスクID: {task_id} の優先度を「{priority_label}」に変更しました。"
     
-    def get_actions(self) -> dict[str, list]:
+    def drain(self) -> dict[str, list]:
         """
-        実行するアクション（作成・削除・完了・未完了・優先度変更）を取得
+        蓄積したアクション（作成・削除・完了・未完了・優先度変更）を取り出し、バッファを空にする
+        
+        リストはコピーせずにそのまま返し、バッファには新しい空のリストを設定します。
+        作成・優先度変更はここで初めてフロントエンド向けの辞書に変換します。
         
         Returns:
             各操作のタスク情報を含む辞書
@@ -150,22 +204,23 @@ class TaskManagementPlugin:
             - uncomplete: 未完了に戻すタスクIDのリスト
             - update_priority: 優先度を変更するタスクの情報リスト
         """
-        return {
-            "create": self.tasks_to_create.copy(),
-            "delete": self.tasks_to_delete.copy(),
-            "complete": self.tasks_to_complete.copy(),
-            "uncomplete": self.tasks_to_uncomplete.copy(),
-            "update_priority": self.tasks_to_update_priority.copy()
+        actions = self._current_actions()
+        drained = {
+            "create": [
+                {"title": title, "priority": priority}
+                for title, priority in actions.tasks_to_create
+            ],
+            "delete": actions.tasks_to_delete,
+            "complete": actions.tasks_to_complete,
+            "uncomplete": actions.tasks_to_uncomplete,
+            "update_priority": [
+                {"task_id": task_id, "priority": priority}
+                for task_id, priority in actions.tasks_to_update_priority
+            ]
         }
-    
-    def clear_actions(self):
-        """
-        アクションリストをクリア
-        
-        リクエスト処理後に呼び出して、次のリクエストのために状態をリセットします。
-        """
-        self.tasks_to_create.clear()
-        self.tasks_to_delete.clear()
-        self.tasks_to_complete.clear()
-        self.tasks_to_uncomplete.clear()
-        self.tasks_to_update_priority.clear()
+        actions.tasks_to_create = []
+        actions.tasks_to_delete = []
+        actions.tasks_to_complete = []
+        actions.tasks_to_uncomplete = []
+        actions.tasks_to_update_priority = []
+        return drained